@@ -0,0 +1,128 @@
+"""
+Contention benchmark for the per-guild serial executor (GuildDispatcher).
+
+Each operation is the racy shape of /play: check `playing`, await a Lavalink call,
+then either start playback or queue the track. Bursts of operations are submitted
+at once and run under four strategies:
+  - none:        run directly (fast but loses tracks under interleaving)
+  - global-lock: one asyncio.Lock for every guild (correct, head-of-line blocking)
+  - guild-lock:  a bare defaultdict(asyncio.Lock), never cleaned up
+  - dispatcher:  GuildDispatcher (per-guild locks dropped when idle, plus wait stats);
+                 the gap to guild-lock is the cost of that bookkeeping
+
+Scenarios:
+  - uniform: every guild gets the same burst
+  - hot:     one guild gets a large burst; reports latency seen by the other guilds
+
+Usage: python bench_dispatch.py [--guilds 1000] [--ops 10] [--hot-ops 1000] [--io-ms 1]
+"""
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+
+from guild_dispatch import GuildDispatcher
+from voice_pool import percentile
+
+
+class GuildState:
+    def __init__(self):
+        self.playing = None
+        self.queue = []
+
+
+async def racy_play(state: GuildState, track: int, io: float):
+    if state.playing is None:
+        await asyncio.sleep(io)  # player.play() round trip
+        state.playing = track
+    else:
+        state.queue.append(track)
+
+
+def lost_tracks(states: dict, submitted: dict) -> int:
+    """Tracks neither playing nor queued (overwritten by an interleaved play)."""
+    lost = 0
+    for gid, tracks in submitted.items():
+        state = states[gid]
+        kept = len(state.queue) + (state.playing is not None)
+        lost += len(tracks) - kept
+    return lost
+
+
+def out_of_order(states: dict, submitted: dict) -> int:
+    """Guilds whose final playing + queue order differs from submission order."""
+    bad = 0
+    for gid, tracks in submitted.items():
+        state = states[gid]
+        if [state.playing] + state.queue != tracks:
+            bad += 1
+    return bad
+
+
+async def run_strategy(strategy: str, workload: list[tuple[int, int]], io: float):
+    states = defaultdict(GuildState)
+    global_lock = asyncio.Lock()
+    guild_locks = defaultdict(asyncio.Lock)
+    dispatcher = GuildDispatcher()
+    latencies = defaultdict(list)
+
+    async def submit(gid, track):
+        start = time.perf_counter()
+        if strategy == "none":
+            await racy_play(states[gid], track, io)
+        elif strategy == "global-lock":
+            async with global_lock:
+                await racy_play(states[gid], track, io)
+        elif strategy == "guild-lock":
+            async with guild_locks[gid]:
+                await racy_play(states[gid], track, io)
+        else:
+            await dispatcher.run(gid, racy_play, states[gid], track, io)
+        latencies[gid].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(submit(gid, track) for gid, track in workload))
+    wall = time.perf_counter() - start
+    return states, latencies, wall
+
+
+def build_workload(guilds: int, ops: int, hot_ops: int):
+    """Interleaves guilds round-robin so same-guild ops are spread through the burst."""
+    per_guild = {gid: ops for gid in range(guilds)}
+    if hot_ops:
+        per_guild[0] = hot_ops
+    submitted = {gid: list(range(n)) for gid, n in per_guild.items()}
+    workload = []
+    for i in range(max(per_guild.values())):
+        workload.extend((gid, i) for gid, n in per_guild.items() if i < n)
+    return workload, submitted
+
+
+async def main(args):
+    io = args.io_ms / 1000
+    print(f"{args.guilds} guilds, {args.ops} ops/guild, hot guild {args.hot_ops} ops, {args.io_ms}ms per play")
+    header = f"{'scenario':<8} {'strategy':<12} {'wall ms':>9} {'p50 ms':>8} {'p99 ms':>8} {'other p99':>10} {'lost':>6} {'reordered':>10}"
+    print(header)
+
+    for scenario, hot_ops in (("uniform", 0), ("hot", args.hot_ops)):
+        workload, submitted = build_workload(args.guilds, args.ops, hot_ops)
+        for strategy in ("none", "global-lock", "guild-lock", "dispatcher"):
+            states, latencies, wall = await run_strategy(strategy, workload, io)
+            all_lat = [v for values in latencies.values() for v in values]
+            # Latency seen by guilds other than the hot one
+            others = [v for gid, values in latencies.items() if gid != 0 for v in values]
+            print(
+                f"{scenario:<8} {strategy:<12} {wall * 1000:>9.1f} "
+                f"{percentile(all_lat, 50) * 1000:>8.2f} {percentile(all_lat, 99) * 1000:>8.2f} "
+                f"{percentile(others, 99) * 1000:>10.2f} "
+                f"{lost_tracks(states, submitted):>6} {out_of_order(states, submitted):>10}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guilds", type=int, default=1000, help="Number of guilds")
+    parser.add_argument("--ops", type=int, default=10, help="Operations per guild in the burst")
+    parser.add_argument("--hot-ops", type=int, default=1000, help="Operations for the hot guild")
+    parser.add_argument("--io-ms", type=float, default=1.0, help="Simulated Lavalink latency per play")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,177 @@
+"""
+Benchmark for the Lavalink REST client layer against a local fake Lavalink server.
+
+Compares, for N encoded tracks:
+  - naive:   one GET /v4/decodetrack per track, new HTTP session per request
+  - pooled:  one GET /v4/decodetrack per track over the shared keep-alive pool
+  - batched: POST /v4/decodetracks in batches over the shared keep-alive pool
+
+Usage: python bench_lavalink.py [--sizes 100,1000,5000] [--latency-ms 2]
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+
+from lavalink_client import LavalinkRestClient
+from voice_pool import percentile
+
+PASSWORD = "bench"
+
+
+def fake_track(encoded: str) -> dict:
+    return {
+        "encoded": encoded,
+        "info": {
+            "identifier": encoded,
+            "isSeekable": True,
+            "author": "bench",
+            "length": 180000,
+            "isStream": False,
+            "position": 0,
+            "title": f"Track {encoded}",
+            "uri": None,
+            "artworkUrl": None,
+            "isrc": None,
+            "sourceName": "bench",
+        },
+        "pluginInfo": {},
+        "userData": {},
+    }
+
+
+class FakeLavalinkServer:
+    """
+    Minimal in-process Lavalink v4 REST server.
+    Adds `latency` seconds per request and counts requests and TCP connections.
+    Set `fail_next` to make the next N requests answer 503.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self.fail_next = 0
+        self._peers = set()
+        self._runner: web.AppRunner | None = None
+        self.uri = ""
+
+    @property
+    def connections(self) -> int:
+        return len(self._peers)
+
+    def reset(self):
+        self.requests = 0
+        self._peers.clear()
+
+    async def _handle(self, request: web.Request, payload):
+        self.requests += 1
+        self._peers.add(request.transport.get_extra_info("peername"))
+        if request.headers.get("Authorization") != PASSWORD:
+            return web.json_response({"message": "Unauthorized"}, status=401)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            return web.json_response({"message": "Unavailable"}, status=503)
+        return web.json_response(await payload(request))
+
+    async def decode_track(self, request: web.Request):
+        async def payload(r):
+            return fake_track(r.query["encodedTrack"])
+        return await self._handle(request, payload)
+
+    async def decode_tracks(self, request: web.Request):
+        async def payload(r):
+            return [fake_track(e) for e in await r.json()]
+        return await self._handle(request, payload)
+
+    async def load_tracks(self, request: web.Request):
+        async def payload(r):
+            return {"loadType": "search", "data": [fake_track(r.query["identifier"])]}
+        return await self._handle(request, payload)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/v4/decodetrack", self.decode_track)
+        app.router.add_post("/v4/decodetracks", self.decode_tracks)
+        app.router.add_get("/v4/loadtracks", self.load_tracks)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.uri = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+async def _timed(coro, latencies: list):
+    start = time.perf_counter()
+    result = await coro
+    latencies.append(time.perf_counter() - start)
+    return result
+
+
+async def run_naive(server: FakeLavalinkServer, encoded: list[str], concurrency: int, latencies: list):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(e):
+        async with sem:
+            # New session per request: no connection reuse
+            async with aiohttp.ClientSession(headers={"Authorization": PASSWORD}) as session:
+                async with session.get(f"{server.uri}/v4/decodetrack", params={"encodedTrack": e}) as resp:
+                    return await resp.json()
+
+    return await asyncio.gather(*(_timed(one(e), latencies) for e in encoded))
+
+
+async def run_pooled(client: LavalinkRestClient, encoded: list[str], latencies: list):
+    return await asyncio.gather(*(_timed(client.decode_track(e), latencies) for e in encoded))
+
+
+async def run_batched(client: LavalinkRestClient, encoded: list[str], latencies: list):
+    return await _timed(client.decode_tracks(encoded), latencies)
+
+
+async def main(sizes: list[int], latency_ms: float, pool_size: int):
+    server = FakeLavalinkServer(latency=latency_ms / 1000)
+    await server.start()
+    print(f"Fake Lavalink at {server.uri} ({latency_ms}ms per request, pool size {pool_size})")
+    print(f"{'mode':<8} {'tracks':>7} {'requests':>9} {'conns':>6} {'wall ms':>9} {'p50 ms':>8} {'p99 ms':>8}")
+
+    try:
+        for n in sizes:
+            encoded = [f"enc{i}" for i in range(n)]
+            for mode in ("naive", "pooled", "batched"):
+                server.reset()
+                latencies = []
+                client = LavalinkRestClient(server.uri, PASSWORD, pool_size=pool_size)
+                start = time.perf_counter()
+                if mode == "naive":
+                    results = await run_naive(server, encoded, pool_size, latencies)
+                elif mode == "pooled":
+                    results = await run_pooled(client, encoded, latencies)
+                else:
+                    results = await run_batched(client, encoded, latencies)
+                wall = time.perf_counter() - start
+                await client.close()
+                assert len(results) == n
+                print(
+                    f"{mode:<8} {n:>7} {server.requests:>9} {server.connections:>6} {wall * 1000:>9.1f} "
+                    f"{percentile(latencies, 50) * 1000:>8.2f} {percentile(latencies, 99) * 1000:>8.2f}"
+                )
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,5000", help="Comma-separated track counts")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Fake server latency per request")
+    parser.add_argument("--pool-size", type=int, default=32, help="Connection pool size / naive concurrency")
+    args = parser.parse_args()
+    asyncio.run(main([int(s) for s in args.sizes.split(",")], args.latency_ms, args.pool_size))
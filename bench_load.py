@@ -0,0 +1,490 @@
+"""
+Multi-guild load test for the bot's real handlers in bot.py.
+
+Replays a synthetic (or recorded JSONL) stream of interactions and voice events at a set
+rate through `play`, `skip`, `queue_cmd`, `clear`, `stop`, `leave`, `join`,
+`on_voice_state_update` and `on_wavelink_track_end`, using in-process fakes for Discord
+and Lavalink. The rate is ramped stage by stage until event-loop lag, p99 handler latency
+or throughput crosses its limit, which is reported as the saturation point.
+
+Usage: python bench_load.py [--guilds 1000] [--start-rate 50] [--step 1.5] [--stage-seconds 5]
+
+Recorded streams are JSON lines: {"guild": 3, "op": "play", "query": "some song"}
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import random
+import resource
+import sys
+import time
+import traceback
+from collections import defaultdict
+
+# bot.py reads these at import time; the load test never connects anywhere
+os.environ.setdefault("DISCORD_TOKEN", "load-test")
+os.environ.setdefault("LAVALINK_PASSWORD", "load-test")
+
+import discord
+import wavelink
+
+import bot
+from bench_lavalink import fake_track
+from voice_pool import percentile
+
+BOT_USER_ID = 1
+OPS = ("play", "queue", "skip", "track_end", "clear", "stop", "leave", "join", "voice_join")
+# Rough mix of a busy music bot: mostly /play and natural track ends
+OP_WEIGHTS = (35, 12, 10, 20, 4, 4, 3, 4, 8)
+
+
+class FakeLatency:
+    """Simulated I/O latency (seconds) for the external services the handlers await."""
+
+    def __init__(self, discord_rest: float, lavalink: float, voice: float):
+        self.discord_rest = discord_rest
+        self.lavalink = lavalink
+        self.voice = voice
+
+
+class FakeResponse:
+    def __init__(self, latency: FakeLatency):
+        self._latency = latency
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+        await asyncio.sleep(self._latency.discord_rest)
+
+    async def send_message(self, *args, **kwargs):
+        self._done = True
+        await asyncio.sleep(self._latency.discord_rest)
+
+
+class FakeFollowup:
+    def __init__(self, latency: FakeLatency):
+        self._latency = latency
+
+    async def send(self, *args, **kwargs):
+        await asyncio.sleep(self._latency.discord_rest)
+
+
+class FakeVoiceState:
+    def __init__(self, channel):
+        self.channel = channel
+
+
+class FakeMember(discord.Member):
+    """A discord.Member (so `isinstance` checks in bot.py pass) without gateway state."""
+
+    id = None
+    bot = False
+    voice = None
+
+    def __init__(self, member_id: int, guild, channel=None, is_bot: bool = False):
+        self.id = member_id
+        self.guild = guild
+        self.bot = is_bot
+        self.voice = FakeVoiceState(channel) if channel else None
+
+
+class FakeInteraction:
+    def __init__(self, user: FakeMember, guild, latency: FakeLatency):
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id
+        self.response = FakeResponse(latency)
+        self.followup = FakeFollowup(latency)
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.voice_client = None
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int, guild: FakeGuild, harness: "LoadHarness"):
+        self.id = channel_id
+        self.name = f"voice-{channel_id}"
+        self.guild = guild
+        self.members = []
+        self._harness = harness
+
+    async def connect(self, cls=None):
+        await asyncio.sleep(self._harness.latency.voice)
+        player = FakePlayer(self.guild, self, self._harness)
+        self.guild.voice_client = player
+        return player
+
+
+class FakePayload:
+    def __init__(self, player, track=None, reason="finished"):
+        self.player = player
+        self.track = track
+        self.reason = reason
+
+
+class FakePlayer:
+    """Stands in for wavelink.Player; uses a real wavelink.Queue and real Playables."""
+
+    def __init__(self, guild: FakeGuild, channel: FakeChannel, harness: "LoadHarness"):
+        self.guild = guild
+        self.channel = channel
+        self.connected = True
+        self.playing = False
+        self.current = None
+        self.queue = wavelink.Queue()
+        self._harness = harness
+
+    async def play(self, track, **kwargs):
+        await asyncio.sleep(self._harness.latency.lavalink)
+        self.current = track
+        self.playing = True
+        # wavelink.Player.play records every played track in the queue history
+        self.queue.history.put(track)
+        # Lavalink answers with a TrackStart event once audio flows
+        self._harness.spawn(bot.on_wavelink_track_start(FakePayload(self, track)))
+        return track
+
+    async def stop(self, **kwargs):
+        await asyncio.sleep(self._harness.latency.lavalink)
+        track, self.current, self.playing = self.current, None, False
+        if track is not None:
+            # Lavalink answers with a TrackEnd event, which auto-plays the next track
+            self._harness.spawn(bot.on_wavelink_track_end(FakePayload(self, track, "stopped")))
+        return track
+
+    async def move_to(self, channel, **kwargs):
+        await asyncio.sleep(self._harness.latency.voice)
+        self.channel = channel
+
+    async def disconnect(self, **kwargs):
+        await asyncio.sleep(self._harness.latency.voice)
+        self.connected = False
+        self.playing = False
+        self.current = None
+        self.queue.clear()
+        if self.guild.voice_client is self:
+            self.guild.voice_client = None
+
+    def finish_track(self):
+        """Simulates the current track ending naturally; returns the TrackEnd payload or None."""
+        if not self.playing:
+            return None
+        track, self.current, self.playing = self.current, None, False
+        return FakePayload(self, track)
+
+
+def _callback(command):
+    # app_commands.Command wraps the coroutine; the load test bypasses the tree and calls it directly
+    return getattr(command, "callback", command)
+
+
+def synthetic_events(guilds: int, seed: int, queries: int = 500):
+    """Infinite stream of random events over `guilds` guilds and `queries` distinct search terms."""
+    rng = random.Random(seed)
+    while True:
+        op = rng.choices(OPS, OP_WEIGHTS)[0]
+        yield {"guild": rng.randrange(guilds), "op": op, "query": f"song {rng.randrange(queries)}"}
+
+
+def recorded_events(path: str):
+    """Infinite stream cycling over a recorded JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    if not events:
+        raise ValueError(f"No events in {path}")
+    return itertools.cycle(events)
+
+
+def rss_bytes() -> int:
+    """Current RSS from /proc when available, else the peak RSS."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class LoadHarness:
+    """Owns the fake guilds/members and dispatches events into bot.py handlers."""
+
+    def __init__(self, guilds: int, latency: FakeLatency):
+        self.latency = latency
+        self.guilds = []
+        self.listeners = []
+        self.joiners = []
+        for gid in range(guilds):
+            guild = FakeGuild(1000 + gid)
+            channel = FakeChannel(10_000 + gid, guild, self)
+            self.guilds.append(guild)
+            self.listeners.append(FakeMember(100_000 + gid, guild, channel))
+            self.joiners.append((FakeMember(200_000 + gid, guild), channel))
+        self.latencies = defaultdict(list)
+        self.errors = 0
+        # First handler traceback; stdout is redirected during stages, so it is kept for the report
+        self.first_error: str | None = None
+        self.abandoned = 0
+        self._background = set()
+
+    def record_error(self, exc: BaseException):
+        self.errors += 1
+        if self.first_error is None:
+            self.first_error = "".join(traceback.format_exception(exc))
+
+    def spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.record_error(task.exception())
+
+    async def drain_background(self):
+        while self._background:
+            await asyncio.gather(*list(self._background), return_exceptions=True)
+
+    def _handler(self, event):
+        idx = event["guild"] % len(self.guilds)
+        guild, user = self.guilds[idx], self.listeners[idx]
+        op = event["op"]
+
+        if op == "track_end":
+            player = guild.voice_client
+            payload = player.finish_track() if player else None
+            return bot.on_wavelink_track_end(payload) if payload else None
+        if op == "voice_join":
+            member, channel = self.joiners[idx]
+            return bot.on_voice_state_update(member, FakeVoiceState(None), FakeVoiceState(channel))
+
+        inter = FakeInteraction(user, guild, self.latency)
+        if op == "play":
+            return _callback(bot.play)(inter, event.get("query", "song"))
+        if op == "queue":
+            return _callback(bot.queue_cmd)(inter)
+        if op in ("skip", "clear", "stop", "leave", "join"):
+            return _callback(getattr(bot, op))(inter)
+        raise ValueError(f"Unknown op: {op}")
+
+    async def dispatch(self, event):
+        start = time.perf_counter()
+        try:
+            coro = self._handler(event)
+            if coro is not None:
+                await coro
+        except asyncio.CancelledError:
+            # Abandoned after its stage's drain timeout; not a completed event
+            self.abandoned += 1
+            raise
+        except Exception as e:
+            self.record_error(e)
+        self.latencies[event["op"]].append(time.perf_counter() - start)
+
+
+async def _monitor_lag(samples: list, interval: float, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - start - interval))
+
+
+async def run_stage(harness: LoadHarness, events, rate: float, duration: float, drain_timeout: float) -> dict:
+    """Dispatches events open-loop at `rate`/s for `duration` seconds and measures the stage."""
+    harness.latencies.clear()
+    harness.errors = 0
+    harness.abandoned = 0
+    lag_samples = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_lag(lag_samples, 0.01, stop))
+    in_flight = set()
+
+    total = int(rate * duration)
+    start = time.perf_counter()
+    for i in range(total):
+        # Open-loop: schedule against the wall clock so a slow loop cannot throttle the offered load
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(harness.dispatch(next(events)))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    dispatch_elapsed = time.perf_counter() - start
+
+    if in_flight:
+        await asyncio.wait(list(in_flight), timeout=drain_timeout)
+    elapsed = time.perf_counter() - start
+    # Cancel stragglers so their latencies are not counted in the next stage
+    leftover = list(in_flight)
+    for task in leftover:
+        task.cancel()
+    await asyncio.gather(*leftover, return_exceptions=True)
+    stop.set()
+    await monitor
+
+    all_latencies = [v for samples in harness.latencies.values() for v in samples]
+    completed = len(all_latencies)
+    return {
+        "rate": rate,
+        "dispatched": total,
+        "completed": completed,
+        "throughput": completed / elapsed if elapsed else 0.0,
+        "dispatch_behind": max(0.0, dispatch_elapsed - duration),
+        "p50": percentile(all_latencies, 50),
+        "p99": percentile(all_latencies, 99),
+        "lag_p99": percentile(lag_samples, 99),
+        "lag_max": max(lag_samples, default=0.0),
+        "rss": rss_bytes(),
+        "estimated": bot.memory.total_bytes,
+        "errors": harness.errors,
+        "abandoned": harness.abandoned,
+        "per_op": {op: percentile(v, 99) for op, v in harness.latencies.items()},
+    }
+
+
+def is_saturated(result: dict, slo_p99: float, slo_lag: float) -> list[str]:
+    """Returns the reasons a stage is considered saturated (empty if healthy)."""
+    reasons = []
+    if result["p99"] > slo_p99:
+        reasons.append(f"p99 {result['p99'] * 1000:.0f}ms > {slo_p99 * 1000:.0f}ms")
+    if result["lag_p99"] > slo_lag:
+        reasons.append(f"loop lag p99 {result['lag_p99'] * 1000:.0f}ms > {slo_lag * 1000:.0f}ms")
+    if result["completed"] < result["dispatched"] * 0.95:
+        reasons.append(f"only {result['completed']}/{result['dispatched']} completed")
+    # A handler that raises returns fast, so errors would otherwise look like a healthy stage
+    if result["errors"]:
+        reasons.append(f"{result['errors']} handler errors")
+    return reasons
+
+
+@contextlib.contextmanager
+def patched_bot(search_latency: float, prewarm: bool):
+    """
+    Points bot.py at in-process fakes: Lavalink search returns real Playables after
+    `search_latency`, and the bot has a user id so voice-state handlers run.
+    """
+
+    async def fake_search(query, **kwargs):
+        await asyncio.sleep(search_latency)
+        return [wavelink.Playable(fake_track(query))]
+
+    original_search = wavelink.Playable.search
+    original_user = bot.bot._connection.user
+    original_prewarm = bot.voice_pool.prewarm_enabled
+    wavelink.Playable.search = fake_search
+    bot.bot._connection.user = FakeMember(BOT_USER_ID, None, is_bot=True)
+    bot.voice_pool.prewarm_enabled = prewarm
+    try:
+        yield
+    finally:
+        wavelink.Playable.search = original_search
+        bot.bot._connection.user = original_user
+        bot.voice_pool.prewarm_enabled = original_prewarm
+
+
+class _CountingSink:
+    """Swallows handler log output during the run so printing does not dominate the measurement."""
+
+    def __init__(self):
+        self.lines = 0
+
+    def write(self, s):
+        self.lines += s.count("\n")
+        return len(s)
+
+    def flush(self):
+        pass
+
+
+async def ramp(args, report) -> dict | None:
+    latency = FakeLatency(args.discord_latency_ms / 1000, args.lavalink_latency_ms / 1000, args.voice_latency_ms / 1000)
+    harness = LoadHarness(args.guilds, latency)
+    events = recorded_events(args.events) if args.events else synthetic_events(args.guilds, args.seed)
+    slo_p99, slo_lag = args.slo_p99_ms / 1000, args.slo_lag_ms / 1000
+
+    print(
+        f"Load test: {args.guilds} guilds, {args.stage_seconds}s stages, "
+        f"SLO p99 {args.slo_p99_ms}ms / loop lag p99 {args.slo_lag_ms}ms",
+        file=report,
+    )
+    print(
+        f"{'rate/s':>8} {'done':>7} {'thru/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'lag p99':>8} {'lag max':>8} {'RSS MB':>8} {'est MB':>8} {'errors':>7}",
+        file=report,
+    )
+
+    rate = args.start_rate
+    last_healthy = None
+    saturated = False
+    sink = _CountingSink()
+    with patched_bot(latency.lavalink, args.prewarm):
+        for _ in range(args.max_stages):
+            with contextlib.redirect_stdout(sink):
+                result = await run_stage(harness, events, rate, args.stage_seconds, args.drain_timeout)
+            reasons = is_saturated(result, slo_p99, slo_lag)
+            print(
+                f"{rate:>8.0f} {result['completed']:>7} {result['throughput']:>8.0f} "
+                f"{result['p50'] * 1000:>8.1f} {result['p99'] * 1000:>8.1f} "
+                f"{result['lag_p99'] * 1000:>8.1f} {result['lag_max'] * 1000:>8.1f} "
+                f"{result['rss'] / 2**20:>8.1f} {result['estimated'] / 2**20:>8.1f} {result['errors']:>7}"
+                + (f"  SATURATED: {', '.join(reasons)}" if reasons else ""),
+                file=report,
+            )
+            if harness.first_error is not None:
+                print(f"First handler error:\n{harness.first_error}", file=report)
+                harness.first_error = None
+            if reasons:
+                saturated = True
+                break
+            last_healthy = result
+            rate *= args.step
+        with contextlib.redirect_stdout(sink):
+            await harness.drain_background()
+
+    if last_healthy is None:
+        print("Saturated at the starting rate; lower --start-rate." if saturated else "No stages run.", file=report)
+        return None
+    if saturated:
+        print(f"Highest healthy rate: {last_healthy['rate']:.0f} events/s across {args.guilds} guilds", file=report)
+    else:
+        print(
+            f"Not saturated up to {last_healthy['rate']:.0f} events/s across {args.guilds} guilds "
+            f"(--max-stages {args.max_stages} reached); raise --max-stages or --start-rate",
+            file=report,
+        )
+    per_op = ", ".join(f"{op} {v * 1000:.1f}ms" for op, v in sorted(last_healthy["per_op"].items()))
+    print(f"p99 per op at that rate: {per_op}", file=report)
+    return last_healthy
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guilds", type=int, default=1000, help="Number of simulated guilds")
+    parser.add_argument("--events", help="Recorded JSONL event stream to replay (default: synthetic)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic event stream")
+    parser.add_argument("--start-rate", type=float, default=50.0, help="Events/s in the first stage")
+    parser.add_argument("--step", type=float, default=1.5, help="Rate multiplier between stages")
+    parser.add_argument("--max-stages", type=int, default=20, help="Stop after this many stages")
+    parser.add_argument("--stage-seconds", type=float, default=5.0, help="Duration of each stage")
+    parser.add_argument("--drain-timeout", type=float, default=5.0, help="Max wait for in-flight events per stage")
+    parser.add_argument("--slo-p99-ms", type=float, default=500.0, help="p99 handler latency limit")
+    parser.add_argument("--slo-lag-ms", type=float, default=50.0, help="p99 event-loop lag limit")
+    parser.add_argument("--discord-latency-ms", type=float, default=20.0, help="Fake Discord REST latency")
+    parser.add_argument("--lavalink-latency-ms", type=float, default=10.0, help="Fake Lavalink REST latency")
+    parser.add_argument("--voice-latency-ms", type=float, default=50.0, help="Fake voice connect/move latency")
+    parser.add_argument("--prewarm", action="store_true", help="Enable voice pre-warm during the run")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(ramp(parse_args(), sys.stdout))
@@ -10,8 +10,20 @@ from bot_logic import (
     on_wavelink_track_end as on_wavelink_track_end_logic,
     validate_query,
     search_with_cache,
+    SEARCH_CACHE_TIER,
+    evict_search_cache,
     MAX_QUEUE_SIZE,
 )
+from memory_budget import (
+    MemoryAccountant,
+    estimate_track_bytes,
+    estimate_tracks_bytes,
+    format_bytes,
+)
+from voice_pool import VoicePool, PlayerBusyError
+from effects import EffectsManager, PRESETS
+from guild_dispatch import GuildDispatcher, GuildSequencer
+from lavalink_client import LavalinkRestClient
 
 load_dotenv()
 
@@ -19,6 +31,23 @@ DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 LAVALINK_URI = os.getenv("LAVALINK_URI", "http://lavalink:2333")
 LAVALINK_PASSWORD = os.getenv("LAVALINK_PASSWORD")
 
+# Voice pre-warm: connect ahead of /play when members join voice in guilds that play music regularly
+VOICE_PREWARM = os.getenv("VOICE_PREWARM", "false").lower() in ("1", "true", "yes")
+PREWARM_MIN_PLAYS = int(os.getenv("PREWARM_MIN_PLAYS", "3"))
+PREWARM_WINDOW = float(os.getenv("PREWARM_WINDOW", "86400"))
+PREWARM_IDLE_TIMEOUT = float(os.getenv("PREWARM_IDLE_TIMEOUT", "300"))
+
+# Lavalink REST tuning (shared connection pool, per-request timeout and retries)
+LAVALINK_POOL_SIZE = int(os.getenv("LAVALINK_POOL_SIZE", "32"))
+LAVALINK_TIMEOUT = float(os.getenv("LAVALINK_TIMEOUT", "5"))
+LAVALINK_RETRIES = int(os.getenv("LAVALINK_RETRIES", "2"))
+
+# Global memory budget for queues, histories and caches (0 = account only, never reject)
+MEMORY_BUDGET_MB = float(os.getenv("MEMORY_BUDGET_MB", "0"))
+
+# Effect changes within this many seconds are merged into one Lavalink filters update
+EFFECTS_BATCH_WINDOW = float(os.getenv("EFFECTS_BATCH_WINDOW", "0.5"))
+
 
 # Parse URI from LAVALINK_URI
 # supports forms like https://host:2333, http://host:2333 or host:2333
@@ -36,6 +65,27 @@ bot = commands.Bot(command_prefix="!", intents=intents)
 
 # Wavelink 3 client
 wl: wavelink.Node | None = None
+lavalink_rest: LavalinkRestClient | None = None
+
+# Orders mutations per guild; different guilds run in parallel
+dispatcher = GuildDispatcher()
+# Orders /play commits per guild by when the command was issued
+play_order = GuildSequencer()
+
+voice_pool = VoicePool(
+    prewarm=VOICE_PREWARM,
+    min_plays=PREWARM_MIN_PLAYS,
+    window=PREWARM_WINDOW,
+    idle_timeout=PREWARM_IDLE_TIMEOUT,
+    # Pre-warm moves/connects and idle disconnects are ordered with the guild's commands
+    serialize=dispatcher.run,
+)
+
+memory = MemoryAccountant(budget_bytes=int(MEMORY_BUDGET_MB * 1024 * 1024))
+# Cached results share track objects with queues; only unqueued tracks count against the cache
+memory.register_cache(SEARCH_CACHE_TIER, lambda needed: evict_search_cache(needed, memory))
+
+effects = EffectsManager(window=EFFECTS_BATCH_WINDOW)
 
 
 @bot.event
@@ -44,8 +94,21 @@ async def on_ready():
     try:
         uri = parse_lavalink_uri(LAVALINK_URI)
 
-        # Build node object
-        node = wavelink.Node(uri=uri, password=LAVALINK_PASSWORD)
+        global lavalink_rest
+        if lavalink_rest is None:
+            lavalink_rest = LavalinkRestClient(
+                uri,
+                LAVALINK_PASSWORD,
+                pool_size=LAVALINK_POOL_SIZE,
+                timeout=LAVALINK_TIMEOUT,
+                retries=LAVALINK_RETRIES,
+            )
+
+        # Build node object; wavelink shares our tuned keep-alive connection pool
+        # (and may close it when the node closes; searches then open a fresh one)
+        node = wavelink.Node(
+            uri=uri, password=LAVALINK_PASSWORD, session=lavalink_rest.get_session()
+        )
 
         # Connect via Pool
         await wavelink.Pool.connect(nodes=[node], client=bot)
@@ -57,14 +120,74 @@ async def on_ready():
 
 # Events (3.x)
 @bot.event
-async def on_wavelink_node_ready(node: wavelink.Node):
-    print(f"Node '{node.identifier}' is ready.")
+async def on_wavelink_node_ready(payload: wavelink.NodeReadyEventPayload):
+    print(f"Node '{payload.node.identifier}' is ready.")
+    if not payload.resumed:
+        # Session was not resumed (restart or failover): players lost their filters
+        await effects.reapply_all(
+            lambda gid: (guild := bot.get_guild(gid)) and guild.voice_client
+        )
 
 
 @bot.event
 async def on_wavelink_track_end(payload: wavelink.TrackEndEventPayload):
     """Event fired when a track ends. Used for auto-play."""
+    if not payload.player or not payload.player.guild:
+        await on_wavelink_track_end_logic(payload)
+        return
+    # Serialized with commands so auto-play cannot interleave with /play, /clear or /stop
+    await dispatcher.run(payload.player.guild.id, _advance_queue, payload)
+
+
+async def _advance_queue(payload: wavelink.TrackEndEventPayload):
+    player = payload.player
+    # Disconnecting (/leave, or the bot leaving voice) can dispatch a TrackEnd after the
+    # guild was released; playing or re-registering the dead player would leak it
+    if not player.connected:
+        return
+    # The event may have waited behind commands; if one of them already started a track,
+    # advancing now would replace it. A "replaced" end means a new track is already playing.
+    if payload.reason == "replaced" or player.playing:
+        return
+    upcoming = next(iter(player.queue), None)
     await on_wavelink_track_end_logic(payload)
+    if upcoming is not None:
+        memory.dequeued(player.guild.id, [upcoming])
+    memory.update_guild(player.guild.id, player)
+
+
+@bot.event
+async def on_wavelink_track_start(payload: wavelink.TrackStartEventPayload):
+    """Event fired when Lavalink starts sending audio. Completes time-to-first-audio measurement."""
+    if not payload.player or not payload.player.guild:
+        return
+    # Read first: audio is already flowing, so a filters round trip must not count towards it
+    result = voice_pool.end_ttfa(payload.player.guild.id)
+    if result:
+        path, elapsed = result
+        print(f"Time to first audio ({path}): {elapsed * 1000:.0f}ms")
+    await effects.ensure_applied(payload.player)
+
+
+@bot.event
+async def on_voice_state_update(
+    member: discord.Member, before: discord.VoiceState, after: discord.VoiceState
+):
+    """Pre-warms the guild's player when a member joins voice (if enabled)."""
+    if not bot.user:
+        return
+    if member.id == bot.user.id and after.channel is None:
+        memory.release_guild(member.guild.id)
+        effects.forget(member.guild.id)
+    await voice_pool.on_voice_state_update(member, before, after, bot.user.id)
+
+
+async def send_ephemeral(inter: discord.Interaction, msg: str):
+    """Replies with the initial response, or a followup if the interaction was already deferred."""
+    if not inter.response.is_done():
+        await inter.response.send_message(msg, ephemeral=True)
+    else:
+        await inter.followup.send(msg, ephemeral=True)
 
 
 async def get_or_connect_player(
@@ -76,35 +199,29 @@ async def get_or_connect_player(
         or not inter.user.voice
         or not inter.user.voice.channel
     ):
-        await inter.response.send_message(
-            "You must be connected to a voice channel.", ephemeral=True
-        )
+        await send_ephemeral(inter, "You must be connected to a voice channel.")
         return None
 
-    player: wavelink.Player = inter.guild.voice_client if inter.guild else None
-    if (
-        player
-        and player.connected
-        and player.channel.id == inter.user.voice.channel.id
-    ):
-        return player
-
     try:
-        # Create a player by connecting to the voice channel
-        # Wavelink 3: pass cls=wavelink.Player is still valid
-        player = await inter.user.voice.channel.connect(cls=wavelink.Player)
-        return player
+        # Reuses a warm player, moves an unattended one to the user's channel, or shares an in-flight connect
+        return await voice_pool.connect(inter.guild, inter.user.voice.channel)
+    except PlayerBusyError as e:
+        await send_ephemeral(
+            inter, f"I'm busy in {e.channel.mention}. Join that channel or wait until it's free."
+        )
+        return None
     except Exception as e:
         # Security: Don't leak exception details (e.g., internal IPs) to user
         print(f"Voice connection error: {e}")
-        msg = "Failed to connect to voice channel. Please check permissions and try again."
-        if not inter.response.is_done():
-            await inter.response.send_message(msg, ephemeral=True)
-        else:
-            await inter.followup.send(msg, ephemeral=True)
+        await send_ephemeral(
+            inter, "Failed to connect to voice channel. Please check permissions and try again."
+        )
         return None
 
 
+MEMORY_LIMIT_MESSAGE = "The bot is at its memory limit right now. Please try again later."
+
+
 def is_privileged(inter: discord.Interaction, player: wavelink.Player) -> bool:
     """
     Check if the user is privileged to modify playback state.
@@ -115,61 +232,160 @@ def is_privileged(inter: discord.Interaction, player: wavelink.Player) -> bool:
     return inter.user.voice.channel.id == player.channel.id
 
 
+NOT_PRIVILEGED_MESSAGE = "You must be in the same voice channel to use this command."
+
+
+async def run_serialized(inter: discord.Interaction, fn, *args):
+    """
+    Runs `fn(*args)` in the guild's serial executor so check-then-mutate sequences
+    on its player and queue never interleave with other commands for the same guild.
+    """
+    if inter.guild is None:
+        return await fn(*args)
+    return await dispatcher.run(inter.guild.id, fn, *args)
+
+
 # Slash commands via app_commands (commands.Bot + bot.tree)
+# Pattern: the check-and-mutate part runs serialized per guild and returns the reply;
+# Discord responses and searches happen outside so they never hold up the guild.
+# Commands defer first: waiting for the guild (e.g. behind a voice handshake) can take
+# longer than Discord's 3s window for the initial response.
 @bot.tree.command(
     name="join", description="Invite the bot to your current voice channel"
 )
 async def join(inter: discord.Interaction):
-    player = await get_or_connect_player(inter)
+    await inter.response.defer(ephemeral=True)
+    player = await run_serialized(inter, get_or_connect_player, inter)
     if not player:
         return
-    await inter.response.send_message(f"Joined: {player.channel.name}", ephemeral=True)
+    await inter.followup.send(f"Joined: {player.channel.name}", ephemeral=True)
 
 
-@bot.tree.command(name="leave", description="Disconnect the bot from voice")
-async def leave(inter: discord.Interaction):
+async def _leave(inter: discord.Interaction) -> str:
     player: wavelink.Player = inter.guild.voice_client if inter.guild else None
     if not player or not player.connected:
-        await inter.response.send_message(
-            "I'm not connected to any voice channel.", ephemeral=True
-        )
-        return
+        return "I'm not connected to any voice channel."
 
     if not is_privileged(inter, player):
-        await inter.response.send_message(
-            "You must be in the same voice channel to use this command.", ephemeral=True
-        )
-        return
+        return NOT_PRIVILEGED_MESSAGE
 
     await player.disconnect()
-    await inter.response.send_message("Disconnected.", ephemeral=True)
+    memory.release_guild(inter.guild.id)
+    effects.forget(inter.guild.id)
+    return "Disconnected."
 
 
-@bot.tree.command(name="stop", description="Stop playback and clear queue")
-async def stop(inter: discord.Interaction):
+@bot.tree.command(name="leave", description="Disconnect the bot from voice")
+async def leave(inter: discord.Interaction):
+    await inter.response.defer(ephemeral=True)
+    msg = await run_serialized(inter, _leave, inter)
+    await inter.followup.send(msg, ephemeral=True)
+
+
+async def _stop(inter: discord.Interaction) -> str:
     player: wavelink.Player = inter.guild.voice_client if inter.guild else None
     if not player or not player.connected:
-        await inter.response.send_message("I'm not in a voice channel.", ephemeral=True)
-        return
+        return "I'm not in a voice channel."
 
     if not is_privileged(inter, player):
-        await inter.response.send_message(
-            "You must be in the same voice channel to use this command.", ephemeral=True
-        )
-        return
+        return NOT_PRIVILEGED_MESSAGE
 
     if not player.playing and player.queue.is_empty:
-        await inter.response.send_message("Nothing is playing.", ephemeral=True)
-        return
+        return "Nothing is playing."
 
+    memory.dequeued(inter.guild.id, player.queue)
     player.queue.clear()
     try:
         await player.stop()
     except Exception:
         pass
-    await inter.response.send_message(
-        "Stopped playback and cleared queue.", ephemeral=True
-    )
+    memory.update_guild(inter.guild.id, player)
+    return "Stopped playback and cleared queue."
+
+
+@bot.tree.command(name="stop", description="Stop playback and clear queue")
+async def stop(inter: discord.Interaction):
+    await inter.response.defer(ephemeral=True)
+    msg = await run_serialized(inter, _stop, inter)
+    await inter.followup.send(msg, ephemeral=True)
+
+
+async def _enqueue(inter: discord.Interaction, results, started: float, warm: bool) -> str:
+    """Plays or queues search results on the guild's player. Returns the reply."""
+    # Re-read the player: another command may have moved or disconnected it since connecting
+    player: wavelink.Player = inter.guild.voice_client
+    if not player or not player.connected:
+        return "I was disconnected from voice. Please try again."
+
+    # results can be a list of Tracks or a Playlist object (depends on source)
+    if isinstance(results, wavelink.Playlist):
+        # Playlist: add all tracks
+        tracks = results.tracks
+        if not tracks:
+            return "Playlist is empty."
+
+        # Security: Check queue limit
+        if len(player.queue) + len(tracks) > MAX_QUEUE_SIZE:
+            return f"Cannot add playlist: Queue limit ({MAX_QUEUE_SIZE}) would be exceeded."
+
+        # Security: Check global memory budget (evicts cold caches before refusing)
+        if not memory.try_reserve(inter.guild.id, estimate_tracks_bytes(tracks)):
+            return MEMORY_LIMIT_MESSAGE
+
+        # Optimization: start the first track directly, skipping queue operations, if idle
+        # with nothing queued. Queued tracks (whose TrackEnd advance has not run yet) go first.
+        start_index = 0
+        if not player.playing and player.queue.is_empty:
+            voice_pool.begin_ttfa(inter.guild.id, started, warm)
+            await player.play(tracks[0], filters=effects.filters_for(inter.guild.id))
+            start_index = 1
+
+        for t in itertools.islice(tracks, start_index, None):
+            player.queue.put(t)
+
+        memory.queued(inter.guild.id, player, itertools.islice(tracks, start_index, None))
+        await _play_next_if_idle(inter, player, started, warm)
+        memory.update_guild(inter.guild.id, player)
+        return f"Added {len(tracks)} tracks from playlist `{results.name}` to the queue."
+
+    # Assume list of tracks
+    track = results[0]
+
+    # Optimization: play immediately if idle with nothing queued, skipping queue operations
+    if not player.playing and player.queue.is_empty:
+        # Security: the played track stays in history, so it counts against the budget too
+        if not memory.try_reserve(inter.guild.id, estimate_track_bytes(track)):
+            return MEMORY_LIMIT_MESSAGE
+        voice_pool.begin_ttfa(inter.guild.id, started, warm)
+        await player.play(track, filters=effects.filters_for(inter.guild.id))
+        memory.update_guild(inter.guild.id, player)
+        return f"Playing: **{track.title}**"
+
+    # Security: Check queue limit
+    if len(player.queue) >= MAX_QUEUE_SIZE:
+        return f"Queue is full (max {MAX_QUEUE_SIZE}). Please wait for tracks to finish."
+
+    if not memory.try_reserve(inter.guild.id, estimate_track_bytes(track)):
+        return MEMORY_LIMIT_MESSAGE
+
+    player.queue.put(track)
+    memory.queued(inter.guild.id, player, [track])
+    await _play_next_if_idle(inter, player, started, warm)
+    memory.update_guild(inter.guild.id, player)
+    return f"Added to queue: **{track.title}**"
+
+
+async def _play_next_if_idle(inter: discord.Interaction, player: wavelink.Player, started: float, warm: bool):
+    """
+    Starts the head of the queue if nothing is playing. Tracks can be queued while idle when
+    the previous track ended but its TrackEnd advance is still waiting behind this command.
+    """
+    if player.playing or player.queue.is_empty:
+        return
+    upcoming = player.queue.get()
+    memory.dequeued(inter.guild.id, [upcoming])
+    voice_pool.begin_ttfa(inter.guild.id, started, warm)
+    await player.play(upcoming, filters=effects.filters_for(inter.guild.id))
 
 
 @bot.tree.command(
@@ -179,25 +395,48 @@ async def stop(inter: discord.Interaction):
 @app_commands.describe(query="Song name or URL")
 @app_commands.checks.cooldown(1, 5.0, key=lambda i: (i.guild_id, i.user.id))
 async def play(inter: discord.Interaction, query: str):
+    await _play(inter, query)
+
+
+async def _play(inter: discord.Interaction, query: str):
+    started = voice_pool.clock()
+    warm = voice_pool.is_warm(inter.guild)
+    # Taken before the first await, so tickets follow the order /play calls were issued in
+    ticket = play_order.take(inter.guild_id)
+    try:
+        msg = await _search_and_enqueue(inter, query, started, warm, ticket)
+    finally:
+        # Also on failure or cancellation, so later /play calls in the guild are not held up
+        play_order.done(inter.guild_id, ticket)
+    if msg:
+        await inter.followup.send(msg)
+
+
+async def _search_and_enqueue(
+    inter: discord.Interaction, query: str, started: float, warm: bool, ticket: int
+) -> str | None:
+    """Runs /play up to its commit. Returns the reply, or None if one was already sent."""
     await inter.response.defer(thinking=True)
 
     # 1. Security: Validate input
     try:
         query = validate_query(query)
     except ValueError as e:
-        await inter.followup.send(f"Invalid query: {e}")
-        return
+        return f"Invalid query: {e}"
 
     # Optimize: concurrently connect to voice and search for tracks
     # This reduces the total time by overlapping the voice connection and search latency.
-    player_task = asyncio.create_task(get_or_connect_player(inter))
-    search_task = asyncio.create_task(search_with_cache(query))
+    # Only the connect is serialized; the search never holds up the guild's other commands.
+    player_task = asyncio.create_task(run_serialized(inter, get_or_connect_player, inter))
+    search_task = asyncio.create_task(search_with_cache(query, lavalink_rest, memory))
 
     player = await player_task
     if not player:
         # If connection failed, we don't need the search results
         search_task.cancel()
-        return
+        return None
+
+    voice_pool.record_play(inter.guild.id)
 
     try:
         # Wavelink 3.x search API
@@ -206,69 +445,27 @@ async def play(inter: discord.Interaction, query: str):
             # We sanitize the query in the output just in case, though backticks help
             # Limiting the output length of query prevents massive messages if query was just under limit
             safe_query = query[:100] + "..." if len(query) > 100 else query
-            await inter.followup.send(f"No results found for: `{safe_query}`")
-            return
+            return f"No results found for: `{safe_query}`"
     except Exception as e:
         # 2. Security: Don't leak exception details to user
         # Sanitize query in logs to prevent log injection
         safe_query_log = query.replace("\n", " ").replace("\r", " ")
         print(f"Search error for query '{safe_query_log}': {e}")
-        await inter.followup.send("An error occurred during search. Please try again later.")
-        return
-
-    # results can be a list of Tracks or a Playlist object (depends on source)
-    if isinstance(results, wavelink.Playlist):
-        # Playlist: add all tracks
-        # Optimization: play the first track immediately if idle
-        tracks = results.tracks
-        if not tracks:
-            await inter.followup.send("Playlist is empty.")
-            return
-
-        # Security: Check queue limit
-        if len(player.queue) + len(tracks) > MAX_QUEUE_SIZE:
-            await inter.followup.send(
-                f"Cannot add playlist: Queue limit ({MAX_QUEUE_SIZE}) would be exceeded."
-            )
-            return
-
-        start_index = 0
-        if not player.playing:
-            await player.play(tracks[0])
-            start_index = 1
-
-        for t in itertools.islice(tracks, start_index, None):
-            player.queue.put(t)
-
-        await inter.followup.send(
-            f"Added {len(tracks)} tracks from playlist `{results.name}` to the queue."
-        )
-    else:
-        # Assume list of tracks
-        track = results[0]
-
-        # Optimization: play immediately if idle, skipping queue operations
-        if not player.playing:
-            await player.play(track)
-            await inter.followup.send(f"Playing: **{track.title}**")
-        else:
-            # Security: Check queue limit
-            if len(player.queue) >= MAX_QUEUE_SIZE:
-                await inter.followup.send(
-                    f"Queue is full (max {MAX_QUEUE_SIZE}). Please wait for tracks to finish."
-                )
-                return
+        return "An error occurred during search. Please try again later."
 
-            player.queue.put(track)
-            await inter.followup.send(f"Added to queue: **{track.title}**")
+    # Searches finish in any order; commit in the order the /play calls were issued.
+    # Only other /play calls wait here, and the guild's slot is taken only for the commit,
+    # so other commands are never held up behind a search.
+    await play_order.wait_turn(inter.guild_id, ticket)
+    # Serialized: the playing check and play/queue happen without other commands in between.
+    return await run_serialized(inter, _enqueue, inter, results, started, warm)
 
 
-@bot.tree.command(name="queue", description="View the current song queue")
-async def queue_cmd(inter: discord.Interaction):
+async def _queue_snapshot(inter: discord.Interaction) -> dict:
+    """Builds the /queue reply from a consistent view of the queue. Returns followup.send kwargs."""
     player: wavelink.Player = inter.guild.voice_client if inter.guild else None
     if not player:
-        await inter.response.send_message("I'm not connected to voice.", ephemeral=True)
-        return
+        return {"content": "I'm not connected to voice."}
 
     embed = discord.Embed(title="🎵 Song Queue", color=discord.Color.blue())
 
@@ -294,45 +491,156 @@ async def queue_cmd(inter: discord.Interaction):
             name=f"Up Next ({queue_len} songs)", value=queue_list, inline=False
         )
 
-    await inter.response.send_message(embed=embed)
+    return {"embed": embed}
 
 
-@bot.tree.command(name="skip", description="Skip the current song")
-async def skip(inter: discord.Interaction):
+@bot.tree.command(name="queue", description="View the current song queue")
+async def queue_cmd(inter: discord.Interaction):
+    await inter.response.defer()
+    # Serialized so the view reflects every earlier command in this guild
+    reply = await run_serialized(inter, _queue_snapshot, inter)
+    await inter.followup.send(**reply)
+
+
+async def _skip(inter: discord.Interaction) -> str:
     player: wavelink.Player = inter.guild.voice_client if inter.guild else None
     if not player or not player.playing:
-        await inter.response.send_message("Nothing is playing.", ephemeral=True)
-        return
+        return "Nothing is playing."
 
     if not is_privileged(inter, player):
-        await inter.response.send_message(
-            "You must be in the same voice channel to use this command.", ephemeral=True
-        )
-        return
+        return NOT_PRIVILEGED_MESSAGE
 
     await player.stop()
-    await inter.response.send_message("Skipped!", ephemeral=True)
+    return "Skipped!"
+
+
+@bot.tree.command(name="skip", description="Skip the current song")
+async def skip(inter: discord.Interaction):
+    await inter.response.defer(ephemeral=True)
+    msg = await run_serialized(inter, _skip, inter)
+    await inter.followup.send(msg, ephemeral=True)
+
+
+async def _clear(inter: discord.Interaction) -> str:
+    player: wavelink.Player = inter.guild.voice_client if inter.guild else None
+    if not player or player.queue.is_empty:
+        return "Queue is already empty."
+
+    if not is_privileged(inter, player):
+        return NOT_PRIVILEGED_MESSAGE
+
+    count = len(player.queue)
+    memory.dequeued(inter.guild.id, player.queue)
+    player.queue.clear()
+    return f"Cleared {count} song(s) from queue."
 
 
 @bot.tree.command(name="clear", description="Clear the entire queue")
 async def clear(inter: discord.Interaction):
+    await inter.response.defer(ephemeral=True)
+    msg = await run_serialized(inter, _clear, inter)
+    await inter.followup.send(msg, ephemeral=True)
+
+
+@bot.tree.command(name="effects", description="Apply an audio effect preset or custom settings")
+@app_commands.describe(
+    preset="Start from a named preset (replaces current effects)",
+    volume="Volume multiplier (0.0-2.0, 1.0 = normal)",
+    bass="Bass boost gain (-0.25-1.0)",
+    treble="Treble boost gain (-0.25-1.0)",
+    speed="Playback speed (0.5-2.0)",
+    pitch="Pitch (0.5-2.0)",
+    rotation="8D rotation speed in Hz (0.0-1.0)",
+    lowpass="Low-pass smoothing (0-100, 0 = off)",
+)
+@app_commands.choices(
+    preset=[app_commands.Choice(name=name, value=name) for name in PRESETS]
+)
+async def effects_cmd(
+    inter: discord.Interaction,
+    preset: str | None = None,
+    volume: app_commands.Range[float, 0.0, 2.0] | None = None,
+    bass: app_commands.Range[float, -0.25, 1.0] | None = None,
+    treble: app_commands.Range[float, -0.25, 1.0] | None = None,
+    speed: app_commands.Range[float, 0.5, 2.0] | None = None,
+    pitch: app_commands.Range[float, 0.5, 2.0] | None = None,
+    rotation: app_commands.Range[float, 0.0, 1.0] | None = None,
+    lowpass: app_commands.Range[float, 0.0, 100.0] | None = None,
+):
     player: wavelink.Player = inter.guild.voice_client if inter.guild else None
-    if not player or player.queue.is_empty:
-        await inter.response.send_message("Queue is already empty.", ephemeral=True)
+    if not player or not player.connected:
+        await inter.response.send_message("I'm not connected to voice.", ephemeral=True)
         return
 
     if not is_privileged(inter, player):
         await inter.response.send_message(
-            "You must be in the same voice channel to use this command.", ephemeral=True
+            NOT_PRIVILEGED_MESSAGE, ephemeral=True
         )
         return
 
-    count = len(player.queue)
-    player.queue.clear()
-    await inter.response.send_message(
-        f"Cleared {count} song(s) from queue.", ephemeral=True
+    try:
+        # Batched: changes within the window are sent to Lavalink as one filters update
+        settings = effects.update(
+            inter.guild.id,
+            player,
+            preset,
+            volume=volume,
+            bass=bass,
+            treble=treble,
+            speed=speed,
+            pitch=pitch,
+            rotation=rotation,
+            lowpass=lowpass,
+        )
+    except ValueError as e:
+        await inter.response.send_message(f"Invalid effect: {e}", ephemeral=True)
+        return
+
+    if not settings:
+        await inter.response.send_message("Effects cleared.", ephemeral=True)
+        return
+
+    summary = ", ".join(f"{name} {value:g}" for name, value in settings.items())
+    await inter.response.send_message(f"Effects: {summary}", ephemeral=True)
+
+
+@bot.tree.command(name="memory", description="Show memory and latency diagnostics (bot owner only)")
+async def memory_cmd(inter: discord.Interaction):
+    # Security: Diagnostics expose other guilds' IDs, so restrict to the application owner
+    if not await bot.is_owner(inter.user):
+        await inter.response.send_message(
+            "This command is restricted to the bot owner.", ephemeral=True
+        )
+        return
+
+    budget = format_bytes(memory.budget_bytes) if memory.budget_bytes else "unlimited"
+    embed = discord.Embed(title="🧠 Memory Usage (estimated)", color=discord.Color.blue())
+    embed.description = (
+        f"Total: **{format_bytes(memory.total_bytes)}** / {budget}\n"
+        f"Rejected enqueues: {memory.rejections}"
     )
 
+    caches = "\n".join(
+        f"{name}: {format_bytes(size)}" for name, size in memory.cache_usage().items()
+    )
+    embed.add_field(name="Caches", value=caches or "None", inline=False)
+
+    top = "\n".join(
+        f"`{gid}` {format_bytes(sum(usage.values()))} "
+        f"(queue {format_bytes(usage['queue'])}, history {format_bytes(usage['history'])})"
+        for gid, usage in memory.top_guilds(10)
+    )
+    embed.add_field(name="Top Guilds", value=top or "None", inline=False)
+
+    # Time-to-first-audio by path, so warm (pre-warmed/connected) and cold /play can be compared
+    ttfa = "\n".join(
+        f"{path}: p50 {stats['p50'] * 1000:.0f}ms, p99 {stats['p99'] * 1000:.0f}ms ({stats['count']} plays)"
+        for path, stats in sorted(voice_pool.ttfa.summary().items())
+    )
+    embed.add_field(name="Time to First Audio", value=ttfa or "No samples yet", inline=False)
+
+    await inter.response.send_message(embed=embed, ephemeral=True)
+
 
 @bot.tree.error
 async def on_app_command_error(
@@ -344,10 +652,8 @@ async def on_app_command_error(
         )
     else:
         print(f"App command error: {error}")
-        if not interaction.response.is_done():
-            await interaction.response.send_message(
-                "An error occurred while processing the command.", ephemeral=True
-            )
+        # Deferred commands need a followup, or the user is left with "thinking..."
+        await send_ephemeral(interaction, "An error occurred while processing the command.")
 
 
 @bot.event
@@ -363,10 +669,24 @@ async def setup_hook():
         print(f"Failed to sync slash commands: {e}")
 
 
+async def main():
+    try:
+        async with bot:
+            await bot.start(DISCORD_TOKEN)
+    finally:
+        # Release the shared Lavalink HTTP pool; close() is a no-op if wavelink already closed it
+        if lavalink_rest is not None:
+            await lavalink_rest.close()
+
+
 if __name__ == "__main__":
     if not DISCORD_TOKEN:
         raise RuntimeError("DISCORD_TOKEN missing")
     if not LAVALINK_URI or not LAVALINK_PASSWORD:
         raise RuntimeError("Lavalink credentials missing in .env")
 
-    bot.run(DISCORD_TOKEN)
+    discord.utils.setup_logging()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -2,15 +2,24 @@ import wavelink
 import asyncio
 from collections import OrderedDict
 from urllib.parse import urlparse
+from memory_budget import estimate_results_bytes, estimate_track_bytes
+from lavalink_client import LavalinkRestError
 
 # LRU Cache settings
 MAX_CACHE_SIZE = 100
 _search_cache = OrderedDict()
+# Estimated bytes per cached query, for memory accounting
+_search_cache_bytes = {}
 _pending_searches = {}
+# Name of the search cache's tier in a MemoryAccountant
+SEARCH_CACHE_TIER = "search"
 
 # Security: Max Queue Size to prevent memory exhaustion
 MAX_QUEUE_SIZE = 500
 
+# Search prefix for non-URL queries (wavelink.Playable.search defaults to YouTube Music)
+SEARCH_SOURCE = "ytmsearch"
+
 def validate_query(query: str) -> str:
     """
     Validates the search query.
@@ -54,9 +63,48 @@ def validate_query(query: str) -> str:
 
     return query
 
-async def search_with_cache(query: str):
+def search_identifier(query: str) -> str:
+    """Lavalink identifier for a query: URLs load as-is, anything else is a prefixed search."""
+    try:
+        if urlparse(query).hostname:
+            return query
+    except ValueError:
+        pass
+    return f"{SEARCH_SOURCE}:{query}"
+
+def results_from_payload(payload: dict):
+    """
+    Builds search results (a list of Playables or a Playlist), as wavelink.Playable.search
+    would, from a /v4/loadtracks payload.
+    Raises LavalinkRestError if Lavalink could not load the query.
+    """
+    load_type = payload.get("loadType")
+    data = payload.get("data")
+    if load_type == "track":
+        return [wavelink.Playable(data)]
+    if load_type == "search":
+        return [wavelink.Playable(t) for t in data]
+    if load_type == "playlist":
+        return wavelink.Playlist(data)
+    if load_type == "error":
+        raise LavalinkRestError(None, f"Lavalink failed to load tracks: {data.get('message')}")
+    return []
+
+async def _load_results(query: str, client):
+    if client is None:
+        # No REST client yet (Lavalink not connected); fall back to wavelink's request path
+        return await wavelink.Playable.search(query)
+    return results_from_payload(await client.load_tracks(search_identifier(query)))
+
+def _tracks(results):
+    return getattr(results, "tracks", results)
+
+async def search_with_cache(query: str, client=None, memory=None):
     """
-    Searches for tracks using Wavelink, with LRU caching and Request Coalescing.
+    Searches for tracks, with LRU caching and Request Coalescing.
+    With a LavalinkRestClient the lookup uses its pooled session, per-request timeout
+    and retries; otherwise it goes through wavelink.Playable.search.
+    With a MemoryAccountant, cached tracks are reported to its search tier.
     """
     if query in _search_cache:
         # Move to end to mark as recently used
@@ -69,7 +117,7 @@ async def search_with_cache(query: str):
 
     # Perform search
     # Create a task to be shared among concurrent requests
-    task = asyncio.create_task(wavelink.Playable.search(query))
+    task = asyncio.create_task(_load_results(query, client))
     _pending_searches[query] = task
 
     try:
@@ -77,8 +125,14 @@ async def search_with_cache(query: str):
 
         # Store in cache only on success
         _search_cache[query] = results
+        _search_cache_bytes[query] = estimate_results_bytes(results)
+        if memory is not None:
+            memory.cache_add(SEARCH_CACHE_TIER, _tracks(results))
         if len(_search_cache) > MAX_CACHE_SIZE:
-            _search_cache.popitem(last=False)  # Remove first (oldest) item
+            evicted, evicted_results = _search_cache.popitem(last=False)  # Remove first (oldest) item
+            _search_cache_bytes.pop(evicted, None)
+            if memory is not None:
+                memory.cache_discard(SEARCH_CACHE_TIER, _tracks(evicted_results))
 
         return results
     finally:
@@ -86,6 +140,36 @@ async def search_with_cache(query: str):
         if query in _pending_searches:
             del _pending_searches[query]
 
+def search_cache_bytes() -> int:
+    """Estimated bytes held by the search cache, including tracks also queued elsewhere."""
+    # Optimization: bounded by MAX_CACHE_SIZE entries, so summing is cheap
+    return sum(_search_cache_bytes.values())
+
+def evict_search_cache(needed: int, memory=None) -> int:
+    """
+    Evicts least recently used search results until `needed` bytes are freed. Returns bytes freed.
+    With a MemoryAccountant, tracks a guild still holds do not count as freed, entries that
+    would free nothing are kept, and dropped tracks are reported to its search tier.
+    """
+    freed = 0
+    for query in list(_search_cache):
+        if freed >= needed:
+            break
+        if memory is None:
+            freeable = _search_cache_bytes.get(query, 0)
+        else:
+            freeable = sum(
+                estimate_track_bytes(t) for t in _tracks(_search_cache[query]) if not memory.is_held(t)
+            )
+            if not freeable:
+                continue
+        results = _search_cache.pop(query)
+        _search_cache_bytes.pop(query, None)
+        if memory is not None:
+            memory.cache_discard(SEARCH_CACHE_TIER, _tracks(results))
+        freed += freeable
+    return freed
+
 async def on_wavelink_track_end(payload: wavelink.TrackEndEventPayload):
     """Event fired when a track ends. Used for auto-play."""
     player = payload.player
@@ -0,0 +1,203 @@
+import asyncio
+from collections import OrderedDict
+
+import wavelink
+
+# Parameter -> (min, max, neutral value)
+PARAMS = {
+    "volume": (0.0, 2.0, 1.0),
+    "bass": (-0.25, 1.0, 0.0),
+    "treble": (-0.25, 1.0, 0.0),
+    "speed": (0.5, 2.0, 1.0),
+    "pitch": (0.5, 2.0, 1.0),
+    "rotation": (0.0, 1.0, 0.0),
+    "lowpass": (0.0, 100.0, 0.0),
+}
+
+PRESETS = {
+    "off": {},
+    "bassboost": {"bass": 0.3},
+    "nightcore": {"speed": 1.2, "pitch": 1.2},
+    "vaporwave": {"speed": 0.85, "pitch": 0.85},
+    "8d": {"rotation": 0.2},
+    "soft": {"lowpass": 20.0},
+    "treble": {"treble": 0.25},
+}
+
+# Guilds whose settings are kept; the least recently used are dropped beyond this
+MAX_SAVED_SETTINGS = 10_000
+
+BASS_BANDS = range(0, 4)
+TREBLE_BANDS = range(10, 15)
+
+
+def build_filter_payload(settings: dict[str, float]) -> dict:
+    """Converts effect settings into a Lavalink v4 filters payload."""
+    payload = {}
+    if "volume" in settings:
+        payload["volume"] = settings["volume"]
+
+    if "bass" in settings or "treble" in settings:
+        # wavelink only accepts a full 15-band equalizer payload
+        gains = [0.0] * 15
+        for b in BASS_BANDS:
+            gains[b] = settings.get("bass", 0.0)
+        for b in TREBLE_BANDS:
+            gains[b] = settings.get("treble", 0.0)
+        payload["equalizer"] = [{"band": b, "gain": g} for b, g in enumerate(gains)]
+
+    if "speed" in settings or "pitch" in settings:
+        payload["timescale"] = {
+            "speed": settings.get("speed", 1.0),
+            "pitch": settings.get("pitch", 1.0),
+            "rate": 1.0,
+        }
+    if "rotation" in settings:
+        payload["rotation"] = {"rotationHz": settings["rotation"]}
+    if "lowpass" in settings:
+        payload["lowPass"] = {"smoothing": settings["lowpass"]}
+    return payload
+
+
+def merge_settings(current: dict[str, float], preset: str | None = None, **params) -> dict[str, float]:
+    """
+    Returns new settings: the preset (if given) replaces `current`, then `params` are applied on top.
+    Parameters set to their neutral value are dropped. Raises ValueError for unknown or out-of-range values.
+    """
+    if preset is not None:
+        if preset not in PRESETS:
+            raise ValueError(f"Unknown preset: {preset}")
+        merged = dict(PRESETS[preset])
+    else:
+        merged = dict(current)
+
+    for name, value in params.items():
+        if value is None:
+            continue
+        if name not in PARAMS:
+            raise ValueError(f"Unknown effect: {name}")
+        low, high, neutral = PARAMS[name]
+        if not low <= value <= high:
+            raise ValueError(f"{name} must be between {low} and {high}.")
+        if value == neutral:
+            merged.pop(name, None)
+        else:
+            merged[name] = value
+    return merged
+
+
+class EffectsManager:
+    """
+    Caches effect settings per guild and applies them to players in batched updates.
+
+    All changes for a guild within `window` seconds are merged into a single
+    `player.set_filters` call. Cached settings are reapplied whenever a player's
+    filters drift from them (new player, track change, node failover).
+
+    Settings outlive the player so they carry over to the next one, but only for the
+    `max_guilds` most recently used guilds, so guilds that never return do not pile up.
+    """
+
+    def __init__(self, window: float = 0.5, max_guilds: int = MAX_SAVED_SETTINGS):
+        self.window = window
+        self.max_guilds = max(1, max_guilds)
+        # Number of set_filters calls sent to Lavalink
+        self.updates = 0
+        # LRU: most recently used guild last
+        self._settings: OrderedDict[int, dict[str, float]] = OrderedDict()
+        # guild_id -> normalized payload the player should have, built lazily
+        self._expected: dict[int, dict] = {}
+        # guild_id -> (player, flush task) for the currently open batching window
+        self._pending: dict[int, tuple[wavelink.Player, asyncio.Task]] = {}
+
+    def settings_for(self, guild_id: int) -> dict[str, float]:
+        return dict(self._settings.get(guild_id, {}))
+
+    def update(self, guild_id: int, player: wavelink.Player, preset: str | None = None, **params) -> dict[str, float]:
+        """
+        Merges a change into the guild's settings and schedules one batched apply.
+        Returns the new settings. Raises ValueError for invalid input.
+        """
+        merged = merge_settings(self._settings.get(guild_id, {}), preset, **params)
+        if merged:
+            self._settings[guild_id] = merged
+            self._settings.move_to_end(guild_id)
+            while len(self._settings) > self.max_guilds:
+                evicted, _ = self._settings.popitem(last=False)
+                self._expected.pop(evicted, None)
+        else:
+            self._settings.pop(guild_id, None)
+        self._expected.pop(guild_id, None)
+
+        pending = self._pending.get(guild_id)
+        if pending is None:
+            task = asyncio.create_task(self._flush_later(guild_id))
+            self._pending[guild_id] = (player, task)
+        else:
+            # Optimization: join the open window instead of sending another update
+            self._pending[guild_id] = (player, pending[1])
+        return merged
+
+    async def _flush_later(self, guild_id: int):
+        try:
+            await asyncio.sleep(self.window)
+            player, _ = self._pending.pop(guild_id)
+            await self.apply(guild_id, player)
+        except Exception as e:
+            print(f"Failed to apply effects in guild {guild_id}: {e}")
+        finally:
+            pending = self._pending.get(guild_id)
+            if pending is not None and pending[1] is asyncio.current_task():
+                del self._pending[guild_id]
+
+    def filters_for(self, guild_id: int) -> wavelink.Filters | None:
+        """Returns Filters for the guild's cached settings, or None if it has none."""
+        settings = self._settings.get(guild_id)
+        if not settings:
+            return None
+        self._settings.move_to_end(guild_id)
+        return wavelink.Filters(data=build_filter_payload(settings))
+
+    def _expected_payload(self, guild_id: int) -> dict:
+        expected = self._expected.get(guild_id)
+        if expected is None:
+            filters = self.filters_for(guild_id) or wavelink.Filters()
+            expected = self._expected[guild_id] = filters()
+        return expected
+
+    async def apply(self, guild_id: int, player: wavelink.Player):
+        """Sends the guild's settings to the player in one update (resets filters if none)."""
+        if not player or not player.connected:
+            return
+        filters = self.filters_for(guild_id) or wavelink.Filters()
+        self.updates += 1
+        # seek=True applies the change immediately instead of at the next buffer boundary
+        await player.set_filters(filters, seek=True)
+
+    async def ensure_applied(self, player: wavelink.Player):
+        """Reapplies cached settings if the player's filters drifted (e.g. new player or failover)."""
+        if not player or not player.guild:
+            return
+        guild_id = player.guild.id
+        if guild_id not in self._settings or guild_id in self._pending:
+            return
+        if player.filters() != self._expected_payload(guild_id):
+            await self.apply(guild_id, player)
+
+    async def reapply_all(self, get_player):
+        """Reapplies cached settings to every guild's player, e.g. after a node reconnects without resuming."""
+        for guild_id in list(self._settings):
+            player = get_player(guild_id)
+            if player:
+                try:
+                    await self.apply(guild_id, player)
+                except Exception as e:
+                    print(f"Failed to reapply effects in guild {guild_id}: {e}")
+
+    def forget(self, guild_id: int):
+        """Drops a pending batched update (the cached settings are kept for the next player)."""
+        # Rebuilt lazily from the settings when the guild plays again
+        self._expected.pop(guild_id, None)
+        pending = self._pending.pop(guild_id, None)
+        if pending is not None:
+            pending[1].cancel()
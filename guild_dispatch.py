@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+
+class GuildDispatcher:
+    """
+    Per-guild serial executor.
+
+    Operations submitted for the same guild run one at a time, in submission order
+    (asyncio.Lock wakes its waiters FIFO). Different guilds run fully in parallel. Each
+    operation runs in its caller's task; a guild's lock exists only while an operation is
+    running or waiting, so idle guilds cost nothing. Plain per-guild locks beat a
+    queue-and-worker executor on both per-op cost and other guilds' tail latency when one
+    guild is hot (see bench_dispatch.py).
+
+    Operations must not submit to and await their own guild's executor (that would
+    wait on itself). Keep slow I/O that does not mutate guild state (searches,
+    Discord responses) outside the executor so it cannot delay the guild's next command.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._locks: dict[int, asyncio.Lock] = {}
+        # guild_id -> operations running or waiting; the lock is dropped when it reaches 0
+        self._users: dict[int, int] = {}
+        # Contention stats: total ops, total/max seconds spent waiting behind earlier ops
+        self.ops = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def pending(self, guild_id: int) -> int:
+        """Number of operations queued (not yet started) for the guild."""
+        users = self._users.get(guild_id, 0)
+        return users - 1 if users and self._locks[guild_id].locked() else users
+
+    @property
+    def active_guilds(self) -> int:
+        """Number of guilds with an operation running or queued."""
+        return len(self._locks)
+
+    async def run(self, guild_id: int, fn, *args):
+        """
+        Runs `await fn(*args)` after every earlier operation for the guild has finished
+        and returns its result (or raises its exception).
+
+        A caller cancelled while waiting is skipped; one cancelled while its operation
+        runs cancels the operation, as with any lock.
+        """
+        lock = self._locks.get(guild_id)
+        if lock is None:
+            lock = self._locks[guild_id] = asyncio.Lock()
+        self._users[guild_id] = self._users.get(guild_id, 0) + 1
+        enqueued_at = self.clock()
+        try:
+            # Optimization: an uncontended acquire returns without suspending
+            async with lock:
+                waited = self.clock() - enqueued_at
+                self.ops += 1
+                self.wait_total += waited
+                if waited > self.wait_max:
+                    self.wait_max = waited
+                return await fn(*args)
+        finally:
+            # Always release the guild, whether finished, errored or cancelled
+            users = self._users[guild_id] - 1
+            if users:
+                self._users[guild_id] = users
+            else:
+                del self._users[guild_id]
+                del self._locks[guild_id]
+
+
+class GuildSequencer:
+    """
+    Per-guild tickets that commit in the order they were issued.
+
+    `take` hands out the guild's next ticket; `wait_turn` returns once every earlier ticket
+    is `done`, so work that becomes ready out of order (e.g. searches of different latency)
+    is still applied in issue order. Every ticket must be marked done exactly once, also on
+    failure or cancellation, or later tickets wait forever. Guilds with no outstanding
+    tickets hold no state.
+    """
+
+    def __init__(self):
+        # guild_id -> [next ticket to hand out, next ticket allowed to commit]
+        self._counters: dict[int, list[int]] = {}
+        # guild_id -> tickets marked done before their turn
+        self._done_early: dict[int, set[int]] = {}
+        # (guild_id, ticket) -> future resolved when that ticket's turn comes
+        self._turns: dict[tuple[int, int], asyncio.Future] = {}
+
+    def take(self, guild_id: int) -> int:
+        counters = self._counters.setdefault(guild_id, [0, 0])
+        ticket = counters[0]
+        counters[0] += 1
+        return ticket
+
+    async def wait_turn(self, guild_id: int, ticket: int):
+        """Waits until every ticket issued before `ticket` in the guild is done."""
+        if self._counters[guild_id][1] == ticket:
+            return
+        future = self._turns[(guild_id, ticket)] = asyncio.get_running_loop().create_future()
+        try:
+            await future
+        finally:
+            self._turns.pop((guild_id, ticket), None)
+
+    def done(self, guild_id: int, ticket: int):
+        """Marks `ticket` finished (committed, failed or cancelled) and wakes the next in line."""
+        counters = self._counters[guild_id]
+        if ticket != counters[1]:
+            self._done_early.setdefault(guild_id, set()).add(ticket)
+            return
+
+        counters[1] += 1
+        early = self._done_early.get(guild_id)
+        while early and counters[1] in early:
+            early.remove(counters[1])
+            counters[1] += 1
+        if not early:
+            self._done_early.pop(guild_id, None)
+
+        if counters[1] == counters[0]:
+            del self._counters[guild_id]
+            return
+        future = self._turns.get((guild_id, counters[1]))
+        if future is not None and not future.done():
+            future.set_result(None)
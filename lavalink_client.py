@@ -0,0 +1,130 @@
+import asyncio
+
+import aiohttp
+
+# Tracks per /v4/decodetracks request; keeps bodies small so one batch does not dominate tail latency
+DECODE_BATCH_SIZE = 100
+
+
+class LavalinkRestError(Exception):
+    """Raised when Lavalink answers with a non-retryable error or retries are exhausted."""
+
+    def __init__(self, status: int | None, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class LavalinkRestClient:
+    """
+    Thin Lavalink v4 REST client sharing one tuned aiohttp connection pool.
+
+    The same session can be handed to `wavelink.Node(session=...)` so that wavelink's own
+    requests reuse the pooled keep-alive connections instead of opening new ones. wavelink
+    may close that session when the node closes; `get_session` then opens a new one.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        password: str,
+        *,
+        pool_size: int = 32,
+        keepalive_timeout: float = 60.0,
+        timeout: float = 5.0,
+        retries: int = 2,
+        backoff: float = 0.25,
+        batch_size: int = DECODE_BATCH_SIZE,
+    ):
+        self.uri = uri.rstrip("/")
+        self.password = password
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        # A negative retry count would make zero attempts; always try at least once
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.batch_size = max(1, batch_size)
+        # Number of HTTP attempts made, including retries
+        self.requests = 0
+        self._session: aiohttp.ClientSession | None = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Returns the shared session, creating it on first use. Must be called from a running loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                # Lavalink is a single host, so the per-host limit is the effective pool size
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Authorization": self.password},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _request(self, method: str, path: str, *, timeout: float | None = None, **kwargs):
+        """
+        Performs a request with a per-attempt timeout, retrying connection errors,
+        timeouts, 429 and 5xx responses with exponential backoff.
+        """
+        session = self.get_session()
+        client_timeout = aiohttp.ClientTimeout(total=timeout if timeout is not None else self.timeout)
+        url = f"{self.uri}{path}"
+        last_error: LavalinkRestError | None = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
+            self.requests += 1
+            try:
+                async with session.request(method, url, timeout=client_timeout, **kwargs) as resp:
+                    if resp.status == 204:
+                        return None
+                    if resp.status < 400:
+                        return await resp.json()
+                    if resp.status != 429 and resp.status < 500:
+                        # Client errors will not succeed on retry
+                        raise LavalinkRestError(resp.status, f"Lavalink {method} {path} failed with {resp.status}")
+                    last_error = LavalinkRestError(resp.status, f"Lavalink {method} {path} failed with {resp.status}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = LavalinkRestError(None, f"Lavalink {method} {path} failed: {type(e).__name__}")
+
+        raise last_error
+
+    async def load_tracks(self, identifier: str, *, timeout: float | None = None) -> dict:
+        """GET /v4/loadtracks. Returns the raw load result payload."""
+        return await self._request("GET", "/v4/loadtracks", params={"identifier": identifier}, timeout=timeout)
+
+    async def decode_track(self, encoded: str, *, timeout: float | None = None) -> dict:
+        """GET /v4/decodetrack. Prefer `decode_tracks` for more than one track."""
+        return await self._request("GET", "/v4/decodetrack", params={"encodedTrack": encoded}, timeout=timeout)
+
+    async def decode_tracks(self, encoded_tracks: list[str], *, timeout: float | None = None) -> list[dict]:
+        """
+        Decodes many encoded tracks via POST /v4/decodetracks.
+        Duplicates are decoded once; batches run concurrently over the shared pool.
+        Results are returned in input order.
+        """
+        if not encoded_tracks:
+            return []
+
+        # Optimization: dict.fromkeys dedupes while preserving order
+        unique = list(dict.fromkeys(encoded_tracks))
+        batches = [unique[i:i + self.batch_size] for i in range(0, len(unique), self.batch_size)]
+        results = await asyncio.gather(
+            *(self._request("POST", "/v4/decodetracks", json=batch, timeout=timeout) for batch in batches)
+        )
+
+        decoded = {}
+        for batch, tracks in zip(batches, results):
+            if len(tracks) != len(batch):
+                raise LavalinkRestError(None, "Lavalink returned a mismatched number of decoded tracks")
+            decoded.update(zip(batch, tracks))
+        return [decoded[e] for e in encoded_tracks]
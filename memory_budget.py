@@ -0,0 +1,278 @@
+import itertools
+
+import wavelink
+
+# Fixed cost of one wavelink.Playable excluding its variable-length strings
+# (instance, __dict__, raw payload dicts, small fields). Calibrated with tracemalloc.
+TRACK_BASE_BYTES = 2400
+
+# Rough fixed cost of a connected player (wavelink.Player, its queues, voice state)
+PLAYER_BASE_BYTES = 16384
+
+
+def format_bytes(n: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GiB"
+
+
+def estimate_track_bytes(track) -> int:
+    """
+    Estimates the memory held by one track.
+    Optimization: O(1) attribute reads instead of a deep getsizeof walk, since every
+    Playable has the same shape and only its strings vary in size.
+    """
+    total = TRACK_BASE_BYTES
+    for name in ("encoded", "title", "author", "uri", "identifier", "artwork"):
+        value = getattr(track, name, None)
+        if isinstance(value, str):
+            total += len(value)
+    return total
+
+
+def estimate_tracks_bytes(tracks) -> int:
+    return sum(estimate_track_bytes(t) for t in tracks)
+
+
+def estimate_results_bytes(results) -> int:
+    """Estimates the memory held by a search result (list of tracks or Playlist)."""
+    # A Playlist exposes its tracks via `.tracks`; a plain search result is already a list
+    return estimate_tracks_bytes(getattr(results, "tracks", results))
+
+
+class MemoryAccountant:
+    """
+    Tracks estimated bytes held per guild (player, queue, history) and per cache tier,
+    and enforces a global budget.
+
+    Every tally is kept as a running total that changes only when tracks become held or
+    released, so reading the global total is O(cache tiers) and updates cost O(tracks changed).
+    Queue changes are reported with `queued`/`dequeued`; `update_guild` picks up the current
+    track and newly played history. When an enqueue would exceed the budget, cold caches are
+    evicted (in registration order, then histories of idle guilds) before it is rejected.
+
+    Tracks a guild holds (queue, history, current) are counted against that guild. Cached
+    search results hand out the same objects, so a cache tier only counts tracks no guild
+    holds; evicting a held track would free nothing. Tracks shared between guilds are
+    counted once per guild, so estimates err on the high side.
+    """
+
+    def __init__(self, budget_bytes: int = 0):
+        # 0 disables enforcement; accounting still runs for diagnostics
+        self.budget_bytes = budget_bytes
+        self.rejections = 0
+        self._guilds: dict[int, dict[str, int]] = {}
+        self._players: dict[int, wavelink.Player] = {}
+        self._guild_total = 0
+        # guild_id -> id(track) -> [track, holds]; keeping the track keeps its id() unique while counted
+        self._held: dict[int, dict[int, list]] = {}
+        self._current: dict[int, wavelink.Playable | None] = {}
+        # guild_id -> history tracks already counted (wavelink's history only grows until cleared)
+        self._history: dict[int, list] = {}
+        # id(track) -> holds across all guilds
+        self._refs: dict[int, int] = {}
+        # name -> evict_fn(bytes_needed); the tier reports its tracks via cache_add/cache_discard
+        self._caches: dict[str, object] = {}
+        # name -> id(track) -> [track, entries]
+        self._cached: dict[str, dict[int, list]] = {}
+        # name -> bytes of cached tracks no guild holds
+        self._cache_bytes: dict[str, int] = {}
+
+    def register_cache(self, name: str, evict_fn):
+        self._caches[name] = evict_fn
+        self._cached.setdefault(name, {})
+        self._cache_bytes.setdefault(name, 0)
+
+    def cache_add(self, name: str, tracks):
+        """Records tracks a cache tier now references."""
+        cached = self._cached[name]
+        for track in tracks:
+            entry = cached.get(id(track))
+            if entry:
+                entry[1] += 1
+                continue
+            cached[id(track)] = [track, 1]
+            if id(track) not in self._refs:
+                self._cache_bytes[name] += estimate_track_bytes(track)
+
+    def cache_discard(self, name: str, tracks):
+        """Records tracks a cache tier dropped."""
+        cached = self._cached[name]
+        for track in tracks:
+            entry = cached.get(id(track))
+            if not entry:
+                continue
+            entry[1] -= 1
+            if entry[1]:
+                continue
+            del cached[id(track)]
+            if id(track) not in self._refs:
+                self._cache_bytes[name] -= estimate_track_bytes(track)
+
+    def cache_usage(self) -> dict[str, int]:
+        return dict(self._cache_bytes)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._guild_total + sum(self._cache_bytes.values())
+
+    def guild_usage(self, guild_id: int) -> dict[str, int]:
+        return dict(self._guilds.get(guild_id, {}))
+
+    def is_held(self, track) -> bool:
+        """True if any guild's queue, history or current track references `track`."""
+        return id(track) in self._refs
+
+    def _ensure_guild(self, guild_id: int, player: wavelink.Player):
+        if guild_id not in self._guilds:
+            self._guilds[guild_id] = {"player": PLAYER_BASE_BYTES, "queue": 0, "history": 0}
+            self._guild_total += PLAYER_BASE_BYTES
+            self._held[guild_id] = {}
+            self._current[guild_id] = None
+            self._history[guild_id] = []
+        self._players[guild_id] = player
+
+    def queued(self, guild_id: int, player: wavelink.Player, tracks):
+        """Counts tracks just put on the guild's queue."""
+        self._ensure_guild(guild_id, player)
+        for track in tracks:
+            self._hold(guild_id, track, "queue")
+
+    def dequeued(self, guild_id: int, tracks):
+        """Releases tracks taken off the guild's queue (played next or cleared)."""
+        if guild_id not in self._guilds:
+            return
+        for track in tracks:
+            self._release(guild_id, track, "queue")
+
+    def update_guild(self, guild_id: int, player: wavelink.Player):
+        """Picks up the player's current track and any history played since the last update."""
+        self._ensure_guild(guild_id, player)
+
+        current = player.current
+        if current is not self._current[guild_id]:
+            if self._current[guild_id] is not None:
+                self._release(guild_id, self._current[guild_id], "queue")
+            if current is not None:
+                self._hold(guild_id, current, "queue")
+            self._current[guild_id] = current
+
+        history = getattr(player.queue, "history", None)
+        counted = self._history[guild_id]
+        if history is None:
+            return
+        if len(history) < len(counted):
+            # Cleared since the last update: release what was counted and start over
+            for track in counted:
+                self._release(guild_id, track, "history")
+            counted.clear()
+        new = history[len(counted):]
+        for track in new:
+            self._hold(guild_id, track, "history")
+        counted.extend(new)
+
+    def release_guild(self, guild_id: int):
+        """Drops all accounting for a guild (e.g. after the bot leaves voice)."""
+        old = self._guilds.pop(guild_id, None)
+        if old:
+            self._guild_total -= sum(old.values())
+        self._players.pop(guild_id, None)
+        self._current.pop(guild_id, None)
+        self._history.pop(guild_id, None)
+        for track, holds in self._held.pop(guild_id, {}).values():
+            self._unref(track, holds)
+
+    def _hold(self, guild_id: int, track, tier: str):
+        nbytes = estimate_track_bytes(track)
+        self._guilds[guild_id][tier] += nbytes
+        self._guild_total += nbytes
+        held = self._held[guild_id]
+        entry = held.get(id(track))
+        if entry:
+            entry[1] += 1
+        else:
+            held[id(track)] = [track, 1]
+        count = self._refs.get(id(track), 0)
+        self._refs[id(track)] = count + 1
+        if not count:
+            # Now held by a guild: stop counting it against the caches that reference it
+            self._move_cached(track, -nbytes)
+
+    def _release(self, guild_id: int, track, tier: str):
+        held = self._held[guild_id]
+        entry = held.get(id(track))
+        if not entry:
+            return
+        nbytes = estimate_track_bytes(track)
+        self._guilds[guild_id][tier] -= nbytes
+        self._guild_total -= nbytes
+        entry[1] -= 1
+        if not entry[1]:
+            del held[id(track)]
+        self._unref(track, 1)
+
+    def _unref(self, track, holds: int):
+        count = self._refs[id(track)] - holds
+        if count:
+            self._refs[id(track)] = count
+            return
+        del self._refs[id(track)]
+        self._move_cached(track, estimate_track_bytes(track))
+
+    def _move_cached(self, track, delta: int):
+        for name, cached in self._cached.items():
+            if id(track) in cached:
+                self._cache_bytes[name] += delta
+
+    def try_reserve(self, guild_id: int, nbytes: int) -> bool:
+        """
+        Returns True if `nbytes` more can be held within the budget, evicting cold caches
+        if needed. Returns False (and counts a rejection) if it still would not fit.
+        """
+        if not self.budget_bytes:
+            return True
+
+        over = self.total_bytes + nbytes - self.budget_bytes
+        if over <= 0:
+            return True
+
+        for evict_fn in self._caches.values():
+            # The tally, not the evictor's own estimate, decides what was actually released
+            before = self.total_bytes
+            evict_fn(over)
+            over -= before - self.total_bytes
+            if over <= 0:
+                return True
+
+        over -= self._evict_histories(over, exclude=guild_id)
+        if over <= 0:
+            return True
+
+        self.rejections += 1
+        return False
+
+    def _evict_histories(self, needed: int, exclude: int) -> int:
+        """Clears play history, idle guilds first and largest first. Returns bytes freed."""
+        candidates = sorted(
+            (gid for gid, usage in self._guilds.items() if usage["history"] and gid != exclude),
+            key=lambda gid: (self._players[gid].playing, -self._guilds[gid]["history"]),
+        )
+        freed = 0
+        for gid in candidates:
+            if freed >= needed:
+                break
+            player = self._players[gid]
+            before = self.total_bytes
+            player.queue.history.clear()
+            # A cleared track still in a cache moves to that cache's tally, so only memory
+            # actually released counts
+            self.update_guild(gid, player)
+            freed += before - self.total_bytes
+        return freed
+
+    def top_guilds(self, n: int = 10) -> list[tuple[int, dict[str, int]]]:
+        """Returns the `n` guilds holding the most memory, largest first."""
+        ranked = sorted(self._guilds.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        return [(gid, dict(usage)) for gid, usage in itertools.islice(ranked, n)]
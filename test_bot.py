@@ -1,7 +1,7 @@
 import sys
 import unittest
 import asyncio
-from unittest.mock import MagicMock, AsyncMock, PropertyMock
+from unittest.mock import MagicMock, AsyncMock, PropertyMock, patch
 
 # Mock wavelink
 # We need to ensure wavelink.Playable is also mocked properly before importing bot_logic
@@ -9,6 +9,7 @@ mock_wavelink = MagicMock()
 sys.modules['wavelink'] = mock_wavelink
 
 import bot_logic
+from memory_budget import MemoryAccountant, estimate_track_bytes
 
 
 class TestOnWavelinkTrackEnd(unittest.IsolatedAsyncioTestCase):
@@ -61,6 +62,81 @@ class TestOnWavelinkTrackEnd(unittest.IsolatedAsyncioTestCase):
         mock_player.play.assert_called_once_with(mock_track)
 
 
+class TestSearchCacheEviction(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests for the search cache memory accounting helpers in bot_logic.py.
+    """
+
+    def setUp(self):
+        bot_logic._search_cache.clear()
+        bot_logic._search_cache_bytes.clear()
+        bot_logic.wavelink.Playable.search = AsyncMock(return_value=["res"])
+
+    async def test_search_cache_bytes_tracks_entries(self):
+        await bot_logic.search_with_cache("q1")
+        await bot_logic.search_with_cache("q2")
+        self.assertGreater(bot_logic.search_cache_bytes(), 0)
+        self.assertEqual(set(bot_logic._search_cache_bytes), {"q1", "q2"})
+
+    async def test_evict_search_cache_removes_oldest_first(self):
+        await bot_logic.search_with_cache("q1")
+        await bot_logic.search_with_cache("q2")
+        per_entry = bot_logic._search_cache_bytes["q1"]
+
+        freed = bot_logic.evict_search_cache(1)
+
+        self.assertEqual(freed, per_entry)
+        self.assertNotIn("q1", bot_logic._search_cache)
+        self.assertIn("q2", bot_logic._search_cache)
+        self.assertEqual(bot_logic.search_cache_bytes(), per_entry)
+
+    async def _cache_tracks(self, accountant, *queries):
+        """Caches one distinct track per query and returns them."""
+        tracks = {q: MagicMock(title=q, encoded=None, author=None, uri=None, identifier=None, artwork=None) for q in queries}
+        bot_logic.wavelink.Playable.search = AsyncMock(side_effect=lambda q: [tracks[q]])
+        for q in queries:
+            await bot_logic.search_with_cache(q, memory=accountant)
+        return tracks
+
+    def _accountant(self, budget_bytes=0):
+        accountant = MemoryAccountant(budget_bytes=budget_bytes)
+        accountant.register_cache(
+            bot_logic.SEARCH_CACHE_TIER, lambda needed: bot_logic.evict_search_cache(needed, accountant)
+        )
+        return accountant
+
+    async def test_queued_tracks_not_counted_against_cache(self):
+        accountant = self._accountant()
+        tracks = await self._cache_tracks(accountant, "q1", "q2")
+
+        accountant.queued(1, MagicMock(), [tracks["q1"]])
+
+        self.assertEqual(accountant.cache_usage(), {"search": estimate_track_bytes(tracks["q2"])})
+
+    async def test_evict_skips_entries_still_queued(self):
+        accountant = self._accountant()
+        tracks = await self._cache_tracks(accountant, "q1", "q2")
+        accountant.queued(1, MagicMock(), [tracks["q1"]])
+
+        freed = bot_logic.evict_search_cache(10**9, accountant)
+
+        # Only q2 frees memory; q1's track lives on in a queue, so dropping it frees nothing
+        self.assertEqual(freed, estimate_track_bytes(tracks["q2"]))
+        self.assertIn("q1", bot_logic._search_cache)
+        self.assertNotIn("q2", bot_logic._search_cache)
+        self.assertEqual(accountant.cache_usage(), {"search": 0})
+
+    async def test_budget_not_met_by_evicting_queued_tracks(self):
+        accountant = self._accountant(budget_bytes=1)
+        tracks = await self._cache_tracks(accountant, "q1")
+        accountant.queued(1, MagicMock(), [tracks["q1"]])
+
+        # The cached track is the queued one, so it is counted once and cannot be evicted
+        self.assertEqual(accountant.cache_usage(), {"search": 0})
+        self.assertFalse(accountant.try_reserve(1, 1))
+        self.assertIn("q1", bot_logic._search_cache)
+
+
 class TestValidateQuery(unittest.TestCase):
     """
     Tests for the validate_query function in bot_logic.py.
@@ -159,6 +235,29 @@ class TestSearchWithCache(unittest.IsolatedAsyncioTestCase):
         # Verify search was NOT called again
         bot_logic.wavelink.Playable.search.assert_called_once()
 
+    async def test_search_uses_rest_client_when_given(self):
+        client = MagicMock()
+        client.load_tracks = AsyncMock(return_value={"loadType": "search", "data": [{"encoded": "a"}, {"encoded": "b"}]})
+
+        results = await bot_logic.search_with_cache("rest song", client)
+
+        client.load_tracks.assert_called_once_with("ytmsearch:rest song")
+        bot_logic.wavelink.Playable.search.assert_not_called()
+        self.assertEqual(len(results), 2)
+
+    async def test_search_identifier(self):
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        self.assertEqual(bot_logic.search_identifier(url), url)
+        self.assertEqual(bot_logic.search_identifier("lofi beats"), "ytmsearch:lofi beats")
+
+    async def test_results_from_payload(self):
+        self.assertEqual(len(bot_logic.results_from_payload({"loadType": "track", "data": {}})), 1)
+        with patch.object(bot_logic.wavelink, "Playlist", return_value="playlist"):
+            self.assertEqual(bot_logic.results_from_payload({"loadType": "playlist", "data": {}}), "playlist")
+        self.assertEqual(bot_logic.results_from_payload({"loadType": "empty", "data": {}}), [])
+        with self.assertRaises(bot_logic.LavalinkRestError):
+            bot_logic.results_from_payload({"loadType": "error", "data": {"message": "blocked"}})
+
     async def test_search_cache_miss_different_queries(self):
         query1 = "song A"
         query2 = "song B"
@@ -0,0 +1,176 @@
+import sys
+import unittest
+import asyncio
+from unittest.mock import MagicMock, AsyncMock
+
+# Mock wavelink before importing effects
+if "wavelink" not in sys.modules:
+    sys.modules["wavelink"] = MagicMock()
+
+from effects import EffectsManager, build_filter_payload, merge_settings
+
+
+def make_player(guild_id=1):
+    player = MagicMock()
+    player.connected = True
+    player.guild.id = guild_id
+    player.set_filters = AsyncMock()
+    return player
+
+
+class TestMergeSettings(unittest.TestCase):
+    def test_preset_replaces_current(self):
+        result = merge_settings({"bass": 0.5}, "nightcore")
+        self.assertEqual(result, {"speed": 1.2, "pitch": 1.2})
+
+    def test_params_combine_with_current(self):
+        result = merge_settings({"bass": 0.5}, None, speed=1.1)
+        self.assertEqual(result, {"bass": 0.5, "speed": 1.1})
+
+    def test_preset_with_overrides(self):
+        result = merge_settings({}, "nightcore", pitch=1.0, volume=0.8)
+        self.assertEqual(result, {"speed": 1.2, "volume": 0.8})
+
+    def test_off_preset_clears(self):
+        self.assertEqual(merge_settings({"bass": 0.5}, "off"), {})
+
+    def test_rejects_out_of_range(self):
+        with self.assertRaises(ValueError):
+            merge_settings({}, None, speed=5.0)
+
+    def test_rejects_unknown_preset(self):
+        with self.assertRaises(ValueError):
+            merge_settings({}, "loud")
+
+
+class TestBuildFilterPayload(unittest.TestCase):
+    def test_empty_settings(self):
+        self.assertEqual(build_filter_payload({}), {})
+
+    def test_bass_and_treble_share_equalizer(self):
+        payload = build_filter_payload({"bass": 0.3, "treble": 0.1})
+        bands = {b["band"]: b["gain"] for b in payload["equalizer"]}
+        self.assertEqual(bands[0], 0.3)
+        self.assertEqual(bands[14], 0.1)
+        self.assertEqual(bands[7], 0.0)
+        self.assertEqual(len(bands), 15)
+
+    def test_timescale_defaults_missing_values(self):
+        payload = build_filter_payload({"speed": 1.2})
+        self.assertEqual(payload["timescale"], {"speed": 1.2, "pitch": 1.0, "rate": 1.0})
+
+    def test_rotation_and_lowpass(self):
+        payload = build_filter_payload({"rotation": 0.2, "lowpass": 20.0, "volume": 0.5})
+        self.assertEqual(payload["rotation"], {"rotationHz": 0.2})
+        self.assertEqual(payload["lowPass"], {"smoothing": 20.0})
+        self.assertEqual(payload["volume"], 0.5)
+
+
+class TestEffectsManager(unittest.IsolatedAsyncioTestCase):
+    async def test_changes_within_window_are_batched(self):
+        manager = EffectsManager(window=0.02)
+        player = make_player()
+
+        # Simulates a burst of slider ticks
+        for gain in (0.1, 0.2, 0.3, 0.4):
+            manager.update(1, player, bass=gain)
+        manager.update(1, player, speed=1.2)
+        await asyncio.sleep(0.05)
+
+        player.set_filters.assert_called_once()
+        self.assertEqual(manager.updates, 1)
+        self.assertEqual(manager.settings_for(1), {"bass": 0.4, "speed": 1.2})
+
+    async def test_separate_windows_send_separate_updates(self):
+        manager = EffectsManager(window=0.01)
+        player = make_player()
+
+        manager.update(1, player, bass=0.1)
+        await asyncio.sleep(0.03)
+        manager.update(1, player, bass=0.2)
+        await asyncio.sleep(0.03)
+
+        self.assertEqual(player.set_filters.call_count, 2)
+
+    async def test_guilds_batch_independently(self):
+        manager = EffectsManager(window=0.01)
+        p1, p2 = make_player(1), make_player(2)
+
+        manager.update(1, p1, preset="bassboost")
+        manager.update(2, p2, preset="nightcore")
+        await asyncio.sleep(0.03)
+
+        p1.set_filters.assert_called_once()
+        p2.set_filters.assert_called_once()
+
+    async def test_ensure_applied_reapplies_on_drift(self):
+        manager = EffectsManager(window=0.01)
+        player = make_player()
+        manager.update(1, player, preset="nightcore")
+        await asyncio.sleep(0.03)
+        player.set_filters.reset_mock()
+
+        # New player (e.g. after failover) with default filters
+        new_player = make_player()
+        await manager.ensure_applied(new_player)
+        new_player.set_filters.assert_called_once()
+
+    async def test_ensure_applied_skips_when_in_sync(self):
+        manager = EffectsManager(window=0.01)
+        player = make_player()
+        manager.update(1, player, preset="nightcore")
+        await asyncio.sleep(0.03)
+        player.set_filters.reset_mock()
+
+        player.filters.return_value = manager._expected_payload(1)
+        await manager.ensure_applied(player)
+        player.set_filters.assert_not_called()
+
+    async def test_ensure_applied_without_settings(self):
+        manager = EffectsManager()
+        player = make_player()
+        await manager.ensure_applied(player)
+        player.set_filters.assert_not_called()
+
+    async def test_reapply_all(self):
+        manager = EffectsManager(window=0.01)
+        players = {1: make_player(1), 2: make_player(2)}
+        manager.update(1, players[1], preset="8d")
+        manager.update(2, players[2], preset="soft")
+        await asyncio.sleep(0.03)
+
+        new_players = {1: make_player(1), 2: make_player(2)}
+        await manager.reapply_all(new_players.get)
+
+        new_players[1].set_filters.assert_called_once()
+        new_players[2].set_filters.assert_called_once()
+
+    async def test_forget_cancels_pending_update(self):
+        manager = EffectsManager(window=0.01)
+        player = make_player()
+        manager.update(1, player, bass=0.3)
+        manager.forget(1)
+        await asyncio.sleep(0.03)
+
+        player.set_filters.assert_not_called()
+        # Settings stay cached for the next player in this guild
+        self.assertEqual(manager.settings_for(1), {"bass": 0.3})
+
+    async def test_saved_settings_are_bounded_lru(self):
+        manager = EffectsManager(window=0.01, max_guilds=2)
+        for gid in (1, 2):
+            manager.update(gid, make_player(gid), bass=0.3)
+            manager._expected_payload(gid)
+        # Guild 1 plays again, so guild 2 is the least recently used
+        manager.filters_for(1)
+        manager.update(3, make_player(3), bass=0.3)
+        await asyncio.sleep(0.03)
+
+        self.assertEqual(manager.settings_for(2), {})
+        self.assertNotIn(2, manager._expected)
+        self.assertEqual(manager.settings_for(1), {"bass": 0.3})
+        self.assertEqual(manager.settings_for(3), {"bass": 0.3})
+
+
+if __name__ == "__main__":
+    unittest.main()
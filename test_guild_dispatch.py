@@ -0,0 +1,499 @@
+import os
+import sys
+import unittest
+import asyncio
+import random
+from collections import deque
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Set dummy environment variables BEFORE importing bot
+os.environ.setdefault("LAVALINK_URI", "http://dummy:2333")
+os.environ.setdefault("LAVALINK_PASSWORD", "dummy_pass")
+os.environ.setdefault("DISCORD_TOKEN", "dummy_token")
+
+# Mock external dependencies (unless another test module already imported bot with mocks)
+if "bot" not in sys.modules:
+    sys.modules["discord"] = MagicMock()
+    sys.modules["discord.ext"] = MagicMock()
+    sys.modules["discord.ext.commands"] = MagicMock()
+    sys.modules["discord.app_commands"] = MagicMock()
+    sys.modules["wavelink"] = MagicMock()
+    sys.modules["dotenv"] = MagicMock()
+
+import bot
+from guild_dispatch import GuildDispatcher, GuildSequencer
+
+
+class TestGuildDispatcher(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests for ordering, isolation and cleanup in GuildDispatcher.
+    """
+
+    async def test_burst_runs_in_submission_order(self):
+        dispatcher = GuildDispatcher()
+        rng = random.Random(0)
+        order = []
+
+        async def op(i):
+            # Random awaits would reorder these without serialization
+            await asyncio.sleep(rng.random() / 1000)
+            order.append(i)
+            return i
+
+        results = await asyncio.gather(*(dispatcher.run(1, op, i) for i in range(50)))
+
+        self.assertEqual(order, list(range(50)))
+        self.assertEqual(results, list(range(50)))
+
+    async def test_guilds_run_in_parallel(self):
+        dispatcher = GuildDispatcher()
+        running = set()
+        overlap = []
+
+        async def op(gid):
+            running.add(gid)
+            await asyncio.sleep(0.01)
+            overlap.append(len(running))
+            running.discard(gid)
+
+        await asyncio.gather(*(dispatcher.run(gid, op, gid) for gid in range(5)))
+
+        self.assertEqual(max(overlap), 5)
+
+    async def test_slow_guild_does_not_block_others(self):
+        dispatcher = GuildDispatcher()
+        done = []
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            done.append("slow")
+
+        async def fast():
+            done.append("fast")
+
+        slow_task = asyncio.create_task(dispatcher.run(1, slow))
+        await asyncio.sleep(0)
+        await dispatcher.run(2, fast)
+
+        self.assertEqual(done, ["fast"])
+        await slow_task
+
+    async def test_exception_propagates_and_queue_continues(self):
+        dispatcher = GuildDispatcher()
+
+        async def fail():
+            await asyncio.sleep(0)
+            raise RuntimeError("boom")
+
+        async def ok():
+            return "ok"
+
+        results = await asyncio.gather(
+            dispatcher.run(1, fail), dispatcher.run(1, ok), return_exceptions=True
+        )
+
+        self.assertIsInstance(results[0], RuntimeError)
+        self.assertEqual(results[1], "ok")
+
+    async def test_cancelled_waiter_is_skipped(self):
+        dispatcher = GuildDispatcher()
+        ran = []
+
+        async def op(i):
+            await asyncio.sleep(0.01)
+            ran.append(i)
+
+        first = asyncio.create_task(dispatcher.run(1, op, 0))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(dispatcher.run(1, op, 1))
+        third = asyncio.create_task(dispatcher.run(1, op, 2))
+        await asyncio.sleep(0)
+        second.cancel()
+
+        await first
+        await third
+        self.assertEqual(ran, [0, 2])
+
+    async def test_operation_cancelled_error_does_not_block_guild(self):
+        dispatcher = GuildDispatcher()
+
+        async def blocker():
+            await asyncio.sleep(0.01)
+
+        async def cancelled_inside():
+            task = asyncio.create_task(asyncio.sleep(1))
+            task.cancel()
+            await task
+
+        async def ok():
+            return "ok"
+
+        first = asyncio.create_task(dispatcher.run(1, blocker))
+        await asyncio.sleep(0)
+        results = await asyncio.gather(
+            dispatcher.run(1, cancelled_inside), dispatcher.run(1, ok), return_exceptions=True
+        )
+        await first
+
+        self.assertIsInstance(results[0], asyncio.CancelledError)
+        self.assertEqual(results[1], "ok")
+
+    async def test_state_released_after_drain(self):
+        dispatcher = GuildDispatcher()
+
+        async def op():
+            await asyncio.sleep(0)
+
+        await asyncio.gather(*(dispatcher.run(gid % 3, op) for gid in range(30)))
+
+        self.assertEqual(dispatcher.active_guilds, 0)
+        self.assertEqual(dispatcher._locks, {})
+        self.assertEqual(dispatcher.ops, 30)
+
+    async def test_pending_counts_waiting_operations(self):
+        dispatcher = GuildDispatcher()
+        gate = asyncio.Event()
+
+        running = asyncio.create_task(dispatcher.run(1, gate.wait))
+        waiting = [asyncio.create_task(dispatcher.run(1, gate.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        self.assertEqual(dispatcher.pending(1), 2)
+        self.assertEqual(dispatcher.pending(2), 0)
+        gate.set()
+        await asyncio.gather(running, *waiting)
+        self.assertEqual(dispatcher.pending(1), 0)
+
+
+class TestGuildSequencer(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests for issue-order commits in GuildSequencer.
+    """
+
+    async def test_commits_in_ticket_order(self):
+        sequencer = GuildSequencer()
+        order = []
+
+        async def worker(ticket, delay):
+            await asyncio.sleep(delay)
+            await sequencer.wait_turn(1, ticket)
+            order.append(ticket)
+            sequencer.done(1, ticket)
+
+        tickets = [sequencer.take(1) for _ in range(3)]
+        # Later tickets become ready first
+        await asyncio.gather(*(worker(t, d) for t, d in zip(tickets, (0.02, 0.01, 0))))
+
+        self.assertEqual(order, tickets)
+        self.assertEqual(sequencer._counters, {})
+
+    async def test_ticket_done_early_does_not_block_later_ones(self):
+        sequencer = GuildSequencer()
+        first, second, third = (sequencer.take(1) for _ in range(3))
+
+        # The second fails before its turn; the third follows the first directly
+        sequencer.done(1, second)
+        waiting = asyncio.create_task(sequencer.wait_turn(1, third))
+        await asyncio.sleep(0)
+        self.assertFalse(waiting.done())
+
+        sequencer.done(1, first)
+        await waiting
+        sequencer.done(1, third)
+        self.assertEqual(sequencer._counters, {})
+        self.assertEqual(sequencer._done_early, {})
+
+    async def test_guilds_are_independent(self):
+        sequencer = GuildSequencer()
+        sequencer.take(1)
+        ticket = sequencer.take(2)
+
+        await asyncio.wait_for(sequencer.wait_turn(2, ticket), 0.1)
+
+
+class FakeQueue(deque):
+    def __init__(self):
+        super().__init__()
+        self.history = []
+
+    @property
+    def is_empty(self):
+        return not self
+
+    def put(self, item):
+        self.append(item)
+
+    def get(self):
+        return self.popleft()
+
+
+class FakeTrack:
+    def __init__(self, title):
+        self.title = title
+
+
+class FakePlaylist:
+    pass
+
+
+class FakePlayer:
+    """
+    Player whose play/stop yield to the loop like Lavalink REST calls do. Like wavelink,
+    `playing` stays True after stop() until Lavalink's TrackEnd event arrives.
+    """
+
+    def __init__(self, guild):
+        self.guild = guild
+        self.connected = True
+        self.current = None
+        self.queue = FakeQueue()
+        self.pending_ends = []
+
+    @property
+    def playing(self):
+        return self.connected and self.current is not None
+
+    async def play(self, track, **kwargs):
+        await asyncio.sleep(0.001)
+        if self.current is not None:
+            self.pending_ends.append("replaced")
+        self.current = track
+
+    async def stop(self, **kwargs):
+        await asyncio.sleep(0.001)
+        if self.current is not None:
+            self.pending_ends.append("stopped")
+
+    def end_track(self, reason="finished"):
+        """Delivers a TrackEnd event the way wavelink does, handled like bot.on_wavelink_track_end."""
+        if reason != "replaced":
+            self.current = None
+        payload = MagicMock()
+        payload.player = self
+        payload.reason = reason
+        return asyncio.create_task(bot.dispatcher.run(self.guild.id, bot._advance_queue, payload))
+
+    async def deliver_pending_ends(self):
+        while self.pending_ends:
+            await self.end_track(self.pending_ends.pop(0))
+
+
+def make_inter(guild_id=4242):
+    inter = MagicMock()
+    inter.guild.id = guild_id
+    inter.guild_id = guild_id
+    inter.response.defer = AsyncMock()
+    inter.followup.send = AsyncMock()
+    inter.guild.voice_client = FakePlayer(inter.guild)
+    return inter
+
+
+@patch.object(bot, "is_privileged", return_value=True)
+@patch.object(bot.wavelink, "Playlist", FakePlaylist)
+class TestCommandOrdering(unittest.IsolatedAsyncioTestCase):
+    """
+    Race-condition tests: bursts of interleaved commands for one guild through bot.py's
+    serialized command bodies.
+    """
+
+    async def asyncSetUp(self):
+        bot.memory.release_guild(4242)
+
+    async def test_unserialized_play_burst_loses_tracks(self, *_):
+        # Documents the race: every /play sees `playing` False before the first play() returns
+        inter = make_inter()
+        player = inter.guild.voice_client
+        tracks = [FakeTrack(f"t{i}") for i in range(5)]
+
+        await asyncio.gather(*(bot._enqueue(inter, [t], 0.0, False) for t in tracks))
+
+        self.assertLess(len(player.queue) + (player.current is not None), len(tracks))
+
+    async def test_serialized_play_burst_keeps_order(self, *_):
+        inter = make_inter()
+        player = inter.guild.voice_client
+        tracks = [FakeTrack(f"t{i}") for i in range(5)]
+
+        replies = await asyncio.gather(
+            *(bot.run_serialized(inter, bot._enqueue, inter, [t], 0.0, False) for t in tracks)
+        )
+
+        self.assertIs(player.current, tracks[0])
+        self.assertEqual(list(player.queue), tracks[1:])
+        self.assertEqual(replies[0], "Playing: **t0**")
+        self.assertTrue(all(r.startswith("Added to queue") for r in replies[1:]))
+
+    async def test_interleaved_play_skip_clear_burst(self, *_):
+        inter = make_inter()
+        player = inter.guild.voice_client
+        a, b, c, d = (FakeTrack(t) for t in "abcd")
+
+        replies = await asyncio.gather(
+            bot.run_serialized(inter, bot._enqueue, inter, [a], 0.0, False),
+            bot.run_serialized(inter, bot._enqueue, inter, [b], 0.0, False),
+            bot.run_serialized(inter, bot._enqueue, inter, [c], 0.0, False),
+            bot.run_serialized(inter, bot._skip, inter),
+            bot.run_serialized(inter, bot._clear, inter),
+            bot.run_serialized(inter, bot._enqueue, inter, [d], 0.0, False),
+        )
+        await player.deliver_pending_ends()
+
+        # a plays, b and c queue, skip stops a, clear drops b and c. a's TrackEnd has not
+        # arrived yet, so d queues and the TrackEnd advance then plays it.
+        self.assertEqual(
+            replies,
+            [
+                "Playing: **a**",
+                "Added to queue: **b**",
+                "Added to queue: **c**",
+                "Skipped!",
+                "Cleared 2 song(s) from queue.",
+                "Added to queue: **d**",
+            ],
+        )
+        self.assertIs(player.current, d)
+        self.assertTrue(player.queue.is_empty)
+
+    async def test_stop_and_play_burst_is_consistent(self, *_):
+        inter = make_inter()
+        player = inter.guild.voice_client
+        a, b = FakeTrack("a"), FakeTrack("b")
+
+        replies = await asyncio.gather(
+            bot.run_serialized(inter, bot._enqueue, inter, [a], 0.0, False),
+            bot.run_serialized(inter, bot._stop, inter),
+            bot.run_serialized(inter, bot._enqueue, inter, [b], 0.0, False),
+        )
+        await player.deliver_pending_ends()
+
+        self.assertEqual(replies[1], "Stopped playback and cleared queue.")
+        self.assertEqual(replies[2], "Added to queue: **b**")
+        self.assertIs(player.current, b)
+        self.assertTrue(player.queue.is_empty)
+
+    async def test_play_ahead_of_delayed_track_end_keeps_queue_order(self, *_):
+        inter = make_inter()
+        player = inter.guild.voice_client
+        a, b, d = FakeTrack("a"), FakeTrack("b"), FakeTrack("d")
+        await bot.run_serialized(inter, bot._enqueue, inter, [a], 0.0, False)
+        await bot.run_serialized(inter, bot._enqueue, inter, [b], 0.0, False)
+
+        # Another command holds the guild while a finishes, so /play d is ahead of the advance
+        gate = asyncio.Event()
+        busy = asyncio.create_task(bot.dispatcher.run(inter.guild.id, gate.wait))
+        await asyncio.sleep(0)
+        play_d = asyncio.create_task(bot.run_serialized(inter, bot._enqueue, inter, [d], 0.0, False))
+        await asyncio.sleep(0)
+        advance = player.end_track("finished")
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(busy, advance)
+
+        # d does not jump the queue: b (queued first) plays and d waits behind it
+        self.assertEqual(await play_d, "Added to queue: **d**")
+        self.assertIs(player.current, b)
+        self.assertEqual(list(player.queue), [d])
+
+    async def test_replaced_track_end_does_not_advance(self, *_):
+        inter = make_inter()
+        player = inter.guild.voice_client
+        a, b = FakeTrack("a"), FakeTrack("b")
+        await bot.run_serialized(inter, bot._enqueue, inter, [a], 0.0, False)
+        await bot.run_serialized(inter, bot._enqueue, inter, [b], 0.0, False)
+
+        await player.end_track("replaced")
+
+        self.assertIs(player.current, a)
+        self.assertEqual(list(player.queue), [b])
+
+    async def test_track_end_after_disconnect_does_not_revive_guild(self, *_):
+        inter = make_inter()
+        player = inter.guild.voice_client
+        a, b = FakeTrack("a"), FakeTrack("b")
+        await bot.run_serialized(inter, bot._enqueue, inter, [a], 0.0, False)
+        await bot.run_serialized(inter, bot._enqueue, inter, [b], 0.0, False)
+
+        # Like /leave: disconnect, release, then the disconnect's TrackEnd arrives
+        player.connected = False
+        bot.memory.release_guild(inter.guild.id)
+        await player.end_track("stopped")
+
+        self.assertEqual(list(player.queue), [b])
+        self.assertEqual(bot.memory.guild_usage(inter.guild.id), {})
+        self.assertFalse(bot.memory.is_held(b))
+
+
+
+@patch.object(bot, "is_privileged", return_value=True)
+@patch.object(bot.wavelink, "Playlist", FakePlaylist)
+class TestPlayIssueOrder(unittest.IsolatedAsyncioTestCase):
+    """
+    Concurrent /play calls through bot._play (the body of the /play command) with searches
+    of different latencies: commits follow the order the calls were issued.
+    """
+
+    async def asyncSetUp(self):
+        bot.memory.release_guild(4242)
+
+    def patched(self, latency, results=None):
+        async def search(query, *args):
+            await asyncio.sleep(latency[query])
+            return results[query] if results is not None else [FakeTrack(query)]
+
+        async def connect(inter):
+            return inter.guild.voice_client
+
+        return (
+            patch.object(bot, "search_with_cache", search),
+            patch.object(bot, "get_or_connect_player", connect),
+        )
+
+    def replies(self, inter):
+        return [c.args[0] for c in inter.followup.send.call_args_list]
+
+    async def test_slow_search_keeps_its_place(self, *_):
+        inter = make_inter()
+        player = inter.guild.voice_client
+        search, connect = self.patched({"slow": 0.03, "medium": 0.015, "fast": 0.0})
+
+        with search, connect:
+            await asyncio.gather(*(bot._play(inter, q) for q in ("slow", "medium", "fast")))
+
+        self.assertEqual(player.current.title, "slow")
+        self.assertEqual([t.title for t in player.queue], ["medium", "fast"])
+        self.assertEqual(
+            self.replies(inter),
+            ["Playing: **slow**", "Added to queue: **medium**", "Added to queue: **fast**"],
+        )
+        self.assertEqual(bot.play_order._counters, {})
+
+    async def test_failed_search_does_not_hold_up_later_plays(self, *_):
+        inter = make_inter()
+        player = inter.guild.voice_client
+        search, connect = self.patched(
+            {"missing": 0.02, "found": 0.0}, {"missing": [], "found": [FakeTrack("found")]}
+        )
+
+        with search, connect:
+            await asyncio.gather(bot._play(inter, "missing"), bot._play(inter, "found"))
+
+        self.assertEqual(player.current.title, "found")
+        self.assertEqual(self.replies(inter), ["No results found for: `missing`", "Playing: **found**"])
+        self.assertEqual(bot.play_order._counters, {})
+
+    async def test_other_commands_do_not_wait_for_search(self, *_):
+        inter = make_inter()
+        search, connect = self.patched({"slow": 0.05})
+
+        with search, connect:
+            pending = asyncio.create_task(bot._play(inter, "slow"))
+            await asyncio.sleep(0.005)
+            reply = await bot.run_serialized(inter, bot._clear, inter)
+            self.assertFalse(pending.done())
+            await pending
+
+        self.assertEqual(reply, "Queue is already empty.")
+
+
+if __name__ == "__main__":
+    unittest.main()
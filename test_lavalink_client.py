@@ -0,0 +1,106 @@
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+# Mock wavelink before importing modules that depend on it
+if "wavelink" not in sys.modules:
+    sys.modules["wavelink"] = MagicMock()
+
+from bench_lavalink import FakeLavalinkServer, PASSWORD
+from lavalink_client import LavalinkRestClient, LavalinkRestError
+
+
+class TestLavalinkRestClient(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests for the LavalinkRestClient against an in-process fake Lavalink server.
+    """
+
+    async def asyncSetUp(self):
+        self.server = FakeLavalinkServer()
+        await self.server.start()
+        self.client = LavalinkRestClient(self.server.uri, PASSWORD, backoff=0)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.stop()
+
+    async def test_decode_tracks_single_request(self):
+        encoded = [f"enc{i}" for i in range(50)]
+        result = await self.client.decode_tracks(encoded)
+
+        self.assertEqual([t["encoded"] for t in result], encoded)
+        self.assertEqual(self.server.requests, 1)
+
+    async def test_decode_tracks_batches_and_preserves_order(self):
+        self.client.batch_size = 2
+        encoded = ["a", "b", "c", "d", "e"]
+        result = await self.client.decode_tracks(encoded)
+
+        self.assertEqual([t["encoded"] for t in result], encoded)
+        self.assertEqual(self.server.requests, 3)
+
+    async def test_decode_tracks_dedupes(self):
+        encoded = ["a", "b", "a", "b", "a"]
+        result = await self.client.decode_tracks(encoded)
+
+        self.assertEqual([t["encoded"] for t in result], encoded)
+        self.assertEqual(self.server.requests, 1)
+
+    async def test_decode_tracks_empty(self):
+        self.assertEqual(await self.client.decode_tracks([]), [])
+        self.assertEqual(self.server.requests, 0)
+
+    async def test_connections_are_reused(self):
+        for i in range(10):
+            await self.client.decode_track(f"enc{i}")
+
+        self.assertEqual(self.server.requests, 10)
+        self.assertEqual(self.server.connections, 1)
+
+    async def test_retries_server_errors(self):
+        self.client.retries = 1
+        self.server.fail_next = 1
+
+        result = await self.client.load_tracks("song")
+
+        self.assertEqual(result["loadType"], "search")
+        self.assertEqual(self.server.requests, 2)
+
+    async def test_raises_after_retries_exhausted(self):
+        self.client.retries = 1
+        self.server.fail_next = 5
+
+        with self.assertRaises(LavalinkRestError) as cm:
+            await self.client.load_tracks("song")
+        self.assertEqual(cm.exception.status, 503)
+        self.assertEqual(self.server.requests, 2)
+
+    async def test_negative_retries_still_attempt_once(self):
+        await self.client.close()
+        self.client = LavalinkRestClient(self.server.uri, PASSWORD, retries=-1, backoff=0)
+        self.server.fail_next = 1
+
+        with self.assertRaises(LavalinkRestError):
+            await self.client.load_tracks("song")
+        self.assertEqual(self.server.requests, 1)
+
+    async def test_client_errors_are_not_retried(self):
+        await self.client.close()
+        self.client = LavalinkRestClient(self.server.uri, "wrong", retries=3, backoff=0)
+
+        with self.assertRaises(LavalinkRestError) as cm:
+            await self.client.load_tracks("song")
+        self.assertEqual(cm.exception.status, 401)
+        self.assertEqual(self.server.requests, 1)
+
+    async def test_per_request_timeout(self):
+        self.server.latency = 0.2
+        self.client.retries = 0
+
+        with self.assertRaises(LavalinkRestError) as cm:
+            await self.client.load_tracks("song", timeout=0.05)
+        self.assertIsNone(cm.exception.status)
+
+
+if __name__ == "__main__":
+    unittest.main()
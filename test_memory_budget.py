@@ -0,0 +1,199 @@
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+# Mock wavelink before importing memory_budget
+if "wavelink" not in sys.modules:
+    sys.modules["wavelink"] = MagicMock()
+
+import memory_budget
+from memory_budget import MemoryAccountant, estimate_track_bytes, format_bytes
+
+
+class FakeTrack:
+    def __init__(self, title="song", encoded="QAAA"):
+        self.title = title
+        self.encoded = encoded
+        self.author = "artist"
+        self.uri = None
+        self.identifier = "id"
+        self.artwork = None
+
+
+class FakeHistory(list):
+    pass
+
+
+def make_player(queued=0, history=0, playing=False):
+    player = MagicMock()
+    player.playing = playing
+    player.current = None
+    player.queue = FakeHistory(FakeTrack() for _ in range(queued))
+    player.queue.history = FakeHistory(FakeTrack() for _ in range(history))
+    return player
+
+
+class TestEstimates(unittest.TestCase):
+    def test_track_estimate_counts_strings(self):
+        short = estimate_track_bytes(FakeTrack(title="a"))
+        long = estimate_track_bytes(FakeTrack(title="a" * 101))
+        self.assertEqual(long - short, 100)
+        self.assertGreaterEqual(short, memory_budget.TRACK_BASE_BYTES)
+
+    def test_track_estimate_tolerates_missing_attributes(self):
+        self.assertEqual(estimate_track_bytes("not a track"), memory_budget.TRACK_BASE_BYTES)
+
+    def test_format_bytes(self):
+        self.assertEqual(format_bytes(512), "512 B")
+        self.assertEqual(format_bytes(2048), "2.0 KiB")
+        self.assertEqual(format_bytes(3 * 1024 * 1024), "3.0 MiB")
+
+
+def account(accountant, guild_id, player):
+    """Registers a fresh player's queue and history the way bot.py reports them."""
+    accountant.queued(guild_id, player, player.queue)
+    accountant.update_guild(guild_id, player)
+
+
+class TestMemoryAccountant(unittest.TestCase):
+    def test_update_and_release_guild(self):
+        accountant = MemoryAccountant()
+        player = make_player(queued=2, history=1)
+        account(accountant, 1, player)
+        usage = accountant.guild_usage(1)
+        self.assertEqual(usage["player"], memory_budget.PLAYER_BASE_BYTES)
+        self.assertEqual(usage["queue"], 2 * estimate_track_bytes(FakeTrack()))
+        self.assertEqual(usage["history"], estimate_track_bytes(FakeTrack()))
+        self.assertEqual(accountant.total_bytes, sum(usage.values()))
+
+        # Clearing the queue and history releases exactly what was counted
+        accountant.dequeued(1, player.queue)
+        player.queue.clear()
+        player.queue.history.clear()
+        accountant.update_guild(1, player)
+        self.assertEqual(accountant.total_bytes, memory_budget.PLAYER_BASE_BYTES)
+
+        accountant.release_guild(1)
+        self.assertEqual(accountant.total_bytes, 0)
+        self.assertEqual(accountant.guild_usage(1), {})
+
+    def test_update_counts_only_new_history_and_current(self):
+        accountant = MemoryAccountant()
+        player = make_player(history=1)
+        accountant.update_guild(1, player)
+
+        # Playing a track makes it current and appends it to history
+        track = FakeTrack()
+        player.current = track
+        player.queue.history.append(track)
+        accountant.update_guild(1, player)
+        accountant.update_guild(1, player)
+
+        per_track = estimate_track_bytes(track)
+        self.assertEqual(accountant.guild_usage(1)["history"], 2 * per_track)
+        self.assertEqual(accountant.guild_usage(1)["queue"], per_track)
+
+        player.current = None
+        accountant.update_guild(1, player)
+        self.assertEqual(accountant.guild_usage(1)["queue"], 0)
+
+    def test_is_held_follows_guild_state(self):
+        accountant = MemoryAccountant()
+        player = make_player(queued=1, history=1)
+        queued, played = player.queue[0], player.queue.history[0]
+
+        account(accountant, 1, player)
+        account(accountant, 2, player)
+        self.assertTrue(accountant.is_held(queued))
+        self.assertTrue(accountant.is_held(played))
+        self.assertFalse(accountant.is_held(FakeTrack()))
+
+        # Still referenced by guild 2 after guild 1 lets go
+        accountant.dequeued(1, [queued])
+        self.assertTrue(accountant.is_held(queued))
+
+        accountant.release_guild(2)
+        self.assertFalse(accountant.is_held(queued))
+        self.assertTrue(accountant.is_held(played))
+
+        accountant.release_guild(1)
+        self.assertFalse(accountant.is_held(played))
+
+    def test_cache_tier_counts_only_unheld_tracks(self):
+        accountant = MemoryAccountant()
+        accountant.register_cache("search", lambda needed: 0)
+        player = make_player()
+        track = FakeTrack()
+        per_track = estimate_track_bytes(track)
+
+        accountant.cache_add("search", [track])
+        self.assertEqual(accountant.cache_usage(), {"search": per_track})
+
+        # Queued: counted against the guild instead of the cache, never twice
+        accountant.queued(1, player, [track])
+        self.assertEqual(accountant.cache_usage(), {"search": 0})
+        self.assertEqual(accountant.total_bytes, memory_budget.PLAYER_BASE_BYTES + per_track)
+
+        accountant.dequeued(1, [track])
+        self.assertEqual(accountant.cache_usage(), {"search": per_track})
+
+        accountant.cache_discard("search", [track])
+        self.assertEqual(accountant.total_bytes, memory_budget.PLAYER_BASE_BYTES)
+
+    def test_no_budget_always_reserves(self):
+        accountant = MemoryAccountant(budget_bytes=0)
+        self.assertTrue(accountant.try_reserve(1, 10**12))
+
+    def test_evicts_caches_before_rejecting(self):
+        cached = [FakeTrack(title=f"t{i}") for i in range(20)]
+
+        def evict(needed):
+            freed = 0
+            while cached and freed < needed:
+                track = cached.pop(0)
+                accountant.cache_discard("search", [track])
+                freed += estimate_track_bytes(track)
+            return freed
+
+        accountant = MemoryAccountant(budget_bytes=60_000)
+        accountant.register_cache("search", evict)
+        accountant.cache_add("search", cached)
+        accountant.update_guild(1, make_player())
+
+        self.assertTrue(accountant.try_reserve(1, 20_000))
+        self.assertLess(len(cached), 20)
+        self.assertLessEqual(accountant.total_bytes + 20_000, 60_000)
+        self.assertEqual(accountant.rejections, 0)
+
+    def test_evicts_idle_histories_before_rejecting(self):
+        # Room for the new reservation only once one guild's history is evicted
+        budget = 3 * memory_budget.PLAYER_BASE_BYTES + 2 * estimate_track_bytes(FakeTrack())
+        accountant = MemoryAccountant(budget_bytes=budget)
+        idle = make_player(history=2, playing=False)
+        busy = make_player(history=2, playing=True)
+        accountant.update_guild(1, idle)
+        accountant.update_guild(2, busy)
+
+        self.assertTrue(accountant.try_reserve(3, memory_budget.PLAYER_BASE_BYTES))
+        self.assertEqual(len(idle.queue.history), 0)
+        self.assertEqual(len(busy.queue.history), 2)
+        self.assertEqual(accountant.guild_usage(1)["history"], 0)
+
+    def test_rejects_when_nothing_left_to_evict(self):
+        accountant = MemoryAccountant(budget_bytes=memory_budget.PLAYER_BASE_BYTES)
+        account(accountant, 1, make_player(queued=1))
+
+        self.assertFalse(accountant.try_reserve(1, 1))
+        self.assertEqual(accountant.rejections, 1)
+
+    def test_top_guilds_ordered_by_usage(self):
+        accountant = MemoryAccountant()
+        account(accountant, 1, make_player(queued=1))
+        account(accountant, 2, make_player(queued=5))
+        account(accountant, 3, make_player(queued=3))
+
+        self.assertEqual([gid for gid, _ in accountant.top_guilds(2)], [2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,311 @@
+import sys
+import unittest
+import asyncio
+from unittest.mock import MagicMock, AsyncMock
+
+# Mock wavelink before importing voice_pool
+if "wavelink" not in sys.modules:
+    sys.modules["wavelink"] = MagicMock()
+
+from voice_pool import VoicePool, LatencyStats, PlayerBusyError, percentile
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_guild(guild_id=1, player=None):
+    guild = MagicMock()
+    guild.id = guild_id
+    guild.voice_client = player
+    return guild
+
+
+def make_channel(channel_id, members=()):
+    channel = MagicMock()
+    channel.id = channel_id
+    channel.members = list(members)
+    return channel
+
+
+def make_player(channel, playing=False):
+    player = MagicMock()
+    player.connected = True
+    player.playing = playing
+    player.channel = channel
+    player.move_to = AsyncMock()
+    player.disconnect = AsyncMock()
+    player.queue.is_empty = True
+    return player
+
+
+def make_member(guild, member_id=42, bot=False):
+    member = MagicMock()
+    member.id = member_id
+    member.bot = bot
+    member.guild = guild
+    return member
+
+
+def voice_state(channel):
+    state = MagicMock()
+    state.channel = channel
+    return state
+
+
+class TestPercentile(unittest.TestCase):
+    def test_percentile_empty(self):
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_percentile_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile(samples, 100), 100)
+
+    def test_latency_stats_bounded(self):
+        stats = LatencyStats(maxlen=3)
+        for v in (1.0, 2.0, 3.0, 4.0):
+            stats.record("cold", v)
+        summary = stats.summary()
+        self.assertEqual(summary["cold"]["count"], 3)
+        self.assertEqual(summary["cold"]["p99"], 4.0)
+
+
+class TestActivity(unittest.TestCase):
+    def test_guild_becomes_active_after_min_plays(self):
+        clock = FakeClock()
+        pool = VoicePool(min_plays=2, window=60, clock=clock)
+        pool.record_play(1)
+        self.assertFalse(pool.is_active_guild(1))
+        pool.record_play(1)
+        self.assertTrue(pool.is_active_guild(1))
+
+    def test_guild_inactive_outside_window(self):
+        clock = FakeClock()
+        pool = VoicePool(min_plays=2, window=60, clock=clock)
+        pool.record_play(1)
+        clock.now += 120
+        pool.record_play(1)
+        self.assertFalse(pool.is_active_guild(1))
+
+
+class TestConnect(unittest.IsolatedAsyncioTestCase):
+    async def test_connect_reuses_player_in_same_channel(self):
+        channel = make_channel(10)
+        player = make_player(channel)
+        guild = make_guild(player=player)
+        pool = VoicePool()
+
+        result = await pool.connect(guild, channel)
+
+        self.assertIs(result, player)
+        player.move_to.assert_not_called()
+        channel.connect.assert_not_called()
+
+    async def test_connect_moves_player_instead_of_reconnecting(self):
+        old_channel = make_channel(10)
+        new_channel = make_channel(20)
+        player = make_player(old_channel)
+        guild = make_guild(player=player)
+        pool = VoicePool()
+
+        result = await pool.connect(guild, new_channel)
+
+        self.assertIs(result, player)
+        player.move_to.assert_called_once_with(new_channel)
+        new_channel.connect.assert_not_called()
+
+    async def test_connect_does_not_steal_playing_player(self):
+        old_channel = make_channel(10)
+        new_channel = make_channel(20)
+        player = make_player(old_channel, playing=True)
+        guild = make_guild(player=player)
+        pool = VoicePool()
+
+        with self.assertRaises(PlayerBusyError) as ctx:
+            await pool.connect(guild, new_channel)
+
+        self.assertIs(ctx.exception.channel, old_channel)
+        player.move_to.assert_not_called()
+
+    async def test_connect_does_not_steal_player_with_listeners(self):
+        old_channel = make_channel(10, members=[make_member(None, bot=False)])
+        new_channel = make_channel(20)
+        player = make_player(old_channel, playing=False)
+        guild = make_guild(player=player)
+        pool = VoicePool()
+
+        with self.assertRaises(PlayerBusyError):
+            await pool.connect(guild, new_channel)
+
+        player.move_to.assert_not_called()
+
+    async def test_concurrent_connects_share_one_handshake(self):
+        channel = make_channel(10)
+        guild = make_guild()
+        player = make_player(channel)
+
+        async def slow_connect(**kwargs):
+            await asyncio.sleep(0.01)
+            guild.voice_client = player
+            return player
+
+        channel.connect = AsyncMock(side_effect=slow_connect)
+        pool = VoicePool()
+
+        res1, res2 = await asyncio.gather(pool.connect(guild, channel), pool.connect(guild, channel))
+
+        self.assertIs(res1, player)
+        self.assertIs(res2, player)
+        channel.connect.assert_called_once()
+        self.assertNotIn(guild.id, pool._pending_connects)
+
+
+class TestPrewarm(unittest.IsolatedAsyncioTestCase):
+    async def test_prewarm_disabled_does_not_connect(self):
+        channel = make_channel(10)
+        guild = make_guild()
+        pool = VoicePool(prewarm=False, min_plays=1)
+        pool.record_play(guild.id)
+
+        await pool.on_voice_state_update(make_member(guild), voice_state(None), voice_state(channel), bot_user_id=1)
+
+        channel.connect.assert_not_called()
+
+    async def test_prewarm_connects_in_active_guild(self):
+        channel = make_channel(10)
+        guild = make_guild()
+        player = make_player(channel)
+        channel.connect = AsyncMock(return_value=player)
+        pool = VoicePool(prewarm=True, min_plays=1)
+        pool.record_play(guild.id)
+
+        await pool.on_voice_state_update(make_member(guild), voice_state(None), voice_state(channel), bot_user_id=1)
+
+        channel.connect.assert_called_once()
+        self.assertIn(guild.id, pool._idle_tasks)
+        # A subsequent /play cancels the idle disconnect
+        pool.record_play(guild.id)
+        self.assertNotIn(guild.id, pool._idle_tasks)
+
+    async def test_prewarm_skips_inactive_guild(self):
+        channel = make_channel(10)
+        guild = make_guild()
+        pool = VoicePool(prewarm=True, min_plays=3)
+        pool.record_play(guild.id)
+
+        await pool.on_voice_state_update(make_member(guild), voice_state(None), voice_state(channel), bot_user_id=1)
+
+        channel.connect.assert_not_called()
+
+    async def test_prewarm_hands_over_idle_player_left_alone(self):
+        old_channel = make_channel(10, members=[make_member(None, bot=True)])
+        new_channel = make_channel(20)
+        player = make_player(old_channel, playing=False)
+        guild = make_guild(player=player)
+        pool = VoicePool(prewarm=True, min_plays=1)
+        pool.record_play(guild.id)
+
+        await pool.on_voice_state_update(make_member(guild), voice_state(None), voice_state(new_channel), bot_user_id=1)
+
+        player.move_to.assert_called_once_with(new_channel)
+
+    async def test_prewarm_does_not_steal_busy_player(self):
+        old_channel = make_channel(10)
+        new_channel = make_channel(20)
+        player = make_player(old_channel, playing=True)
+        guild = make_guild(player=player)
+        pool = VoicePool(prewarm=True, min_plays=1)
+        pool.record_play(guild.id)
+
+        await pool.on_voice_state_update(make_member(guild), voice_state(None), voice_state(new_channel), bot_user_id=1)
+
+        player.move_to.assert_not_called()
+
+    async def test_idle_prewarmed_player_disconnects(self):
+        channel = make_channel(10)
+        guild = make_guild()
+        player = make_player(channel)
+
+        async def connect(**kwargs):
+            guild.voice_client = player
+            return player
+
+        channel.connect = AsyncMock(side_effect=connect)
+        pool = VoicePool(prewarm=True, min_plays=1, idle_timeout=0.01)
+        pool.record_play(guild.id)
+
+        await pool.on_voice_state_update(make_member(guild), voice_state(None), voice_state(channel), bot_user_id=1)
+        await asyncio.sleep(0.05)
+
+        player.disconnect.assert_called_once()
+        self.assertNotIn(guild.id, pool._idle_tasks)
+
+    async def test_prewarm_and_idle_disconnect_are_serialized(self):
+        channel = make_channel(10)
+        guild = make_guild()
+        player = make_player(channel)
+
+        async def connect(**kwargs):
+            guild.voice_client = player
+            return player
+
+        serialized = []
+
+        async def serialize(guild_id, fn, *args):
+            serialized.append((guild_id, fn.__name__))
+            return await fn(*args)
+
+        channel.connect = AsyncMock(side_effect=connect)
+        pool = VoicePool(prewarm=True, min_plays=1, idle_timeout=0.01, serialize=serialize)
+        pool.record_play(guild.id)
+
+        await pool.on_voice_state_update(make_member(guild), voice_state(None), voice_state(channel), bot_user_id=1)
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(serialized, [(guild.id, "_prewarm"), (guild.id, "_disconnect_if_idle")])
+        player.disconnect.assert_called_once()
+
+    async def test_connect_cancels_idle_disconnect(self):
+        channel = make_channel(10)
+        player = make_player(channel)
+        guild = make_guild(player=player)
+        pool = VoicePool(idle_timeout=0.01)
+        pool._schedule_idle(guild)
+
+        await pool.connect(guild, channel)
+        await asyncio.sleep(0.03)
+
+        player.disconnect.assert_not_called()
+        self.assertNotIn(guild.id, pool._idle_tasks)
+
+
+class TestTimeToFirstAudio(unittest.TestCase):
+    def test_ttfa_recorded_per_path(self):
+        clock = FakeClock()
+        pool = VoicePool(clock=clock)
+
+        pool.begin_ttfa(1, clock(), warm=False)
+        clock.now += 2.0
+        self.assertEqual(pool.end_ttfa(1), ("cold", 2.0))
+
+        pool.begin_ttfa(1, clock(), warm=True)
+        clock.now += 0.5
+        self.assertEqual(pool.end_ttfa(1), ("warm", 0.5))
+
+        summary = pool.ttfa.summary()
+        self.assertEqual(summary["cold"]["count"], 1)
+        self.assertEqual(summary["warm"]["p50"], 0.5)
+
+    def test_ttfa_end_without_begin(self):
+        pool = VoicePool()
+        self.assertIsNone(pool.end_ttfa(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,244 @@
+import asyncio
+import time
+from collections import deque
+
+import wavelink
+
+
+def percentile(samples, pct: float) -> float:
+    """
+    Returns the nearest-rank percentile of a sequence of numbers.
+    Returns 0.0 for an empty sequence.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    # Nearest-rank: ceil(pct/100 * N) - 1, clamped to the valid index range
+    rank = max(0, min(len(ordered) - 1, -(-len(ordered) * pct // 100) - 1))
+    return ordered[int(rank)]
+
+
+class PlayerBusyError(Exception):
+    """Raised when the guild's player is in use in another channel and cannot be moved."""
+
+    def __init__(self, channel):
+        super().__init__(f"Player is busy in channel {channel.id}")
+        self.channel = channel
+
+
+def can_hand_over(player) -> bool:
+    """
+    True if the player may be moved to another channel: nothing is playing and no
+    human is left in its channel, so moving it takes nothing away from anyone.
+    """
+    return not player.playing and not any(not m.bot for m in player.channel.members)
+
+
+class LatencyStats:
+    """
+    Rolling latency samples keyed by label (e.g. "warm" / "cold").
+    Memory is bounded by `maxlen` samples per label.
+    """
+
+    def __init__(self, maxlen: int = 500):
+        self.maxlen = maxlen
+        self._samples: dict[str, deque] = {}
+
+    def record(self, label: str, seconds: float):
+        samples = self._samples.get(label)
+        if samples is None:
+            samples = self._samples[label] = deque(maxlen=self.maxlen)
+        samples.append(seconds)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {
+            label: {
+                "count": len(samples),
+                "p50": percentile(samples, 50),
+                "p95": percentile(samples, 95),
+                "p99": percentile(samples, 99),
+            }
+            for label, samples in self._samples.items()
+        }
+
+
+async def _run_now(guild_id: int, fn, *args):
+    return await fn(*args)
+
+
+class VoicePool:
+    """
+    Per-guild voice connection pool.
+
+    - Coalesces concurrent connects for the same guild (pre-warm vs. /play) into one handshake.
+    - Moves an idle, unattended player between channels instead of tearing it down and reconnecting.
+    - Optionally pre-warms a player when a member joins voice in a guild that plays music regularly.
+    - Measures time-to-first-audio for warm and cold paths.
+
+    `serialize(guild_id, fn, *args)` (e.g. GuildDispatcher.run) orders the pool's own player
+    changes (pre-warm connect/move, idle disconnect) with the guild's commands.
+    """
+
+    def __init__(
+        self,
+        prewarm: bool = False,
+        min_plays: int = 3,
+        window: float = 86400.0,
+        idle_timeout: float = 300.0,
+        clock=time.monotonic,
+        serialize=None,
+    ):
+        self.prewarm_enabled = prewarm
+        self.min_plays = max(1, min_plays)
+        self.window = window
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self.serialize = serialize or _run_now
+        self.ttfa = LatencyStats()
+        # guild_id -> timestamps of the last `min_plays` /play calls
+        self._recent_plays: dict[int, deque] = {}
+        # guild_id -> in-flight connect task, shared by every caller for that guild
+        self._pending_connects: dict[int, asyncio.Task] = {}
+        # guild_id -> task that disconnects a pre-warmed player nobody used
+        self._idle_tasks: dict[int, asyncio.Task] = {}
+        # guild_id -> (start time, "warm" | "cold") for the pending first-audio measurement
+        self._ttfa_pending: dict[int, tuple[float, str]] = {}
+
+    def record_play(self, guild_id: int):
+        """Records a /play in the guild for the "plays music regularly" heuristic."""
+        plays = self._recent_plays.get(guild_id)
+        if plays is None:
+            plays = self._recent_plays[guild_id] = deque(maxlen=self.min_plays)
+        plays.append(self.clock())
+        self._cancel_idle(guild_id)
+
+    def is_active_guild(self, guild_id: int) -> bool:
+        """True if the guild had at least `min_plays` plays within the last `window` seconds."""
+        plays = self._recent_plays.get(guild_id)
+        if not plays or len(plays) < self.min_plays:
+            return False
+        # Optimization: the deque only holds the last `min_plays` entries, so checking the oldest is O(1)
+        return self.clock() - plays[0] <= self.window
+
+    def is_warm(self, guild) -> bool:
+        """True if a player is already connected (or connecting) for the guild."""
+        if guild is None:
+            return False
+        if guild.id in self._pending_connects:
+            return True
+        player = guild.voice_client
+        return bool(player and player.connected)
+
+    async def connect(self, guild, channel) -> wavelink.Player:
+        """
+        Returns a Player connected to `channel`, reusing or moving the guild's existing player.
+        Concurrent callers for the same guild share a single voice handshake.
+        Raises PlayerBusyError if the player is in use in another channel.
+        """
+        # The player is wanted again; a pending idle disconnect must not tear it down
+        self._cancel_idle(guild.id)
+        pending = self._pending_connects.get(guild.id)
+        if pending is not None:
+            # Shield so a cancelled caller does not abort the handshake for everyone else
+            await asyncio.shield(pending)
+
+        player: wavelink.Player = guild.voice_client
+        if player and player.connected:
+            if player.channel.id != channel.id:
+                # Security: never pull a player away from the people listening to it
+                if not can_hand_over(player):
+                    raise PlayerBusyError(player.channel)
+                # Move keeps the Lavalink player (queue, current track, filters) intact
+                await player.move_to(channel)
+            return player
+
+        task = asyncio.create_task(channel.connect(cls=wavelink.Player))
+        self._pending_connects[guild.id] = task
+        # Cleanup is tied to the task, not the caller, so it also runs if the caller is cancelled
+        task.add_done_callback(lambda t, gid=guild.id: self._drop_pending(gid, t))
+        return await asyncio.shield(task)
+
+    def _drop_pending(self, guild_id: int, task: asyncio.Task):
+        if self._pending_connects.get(guild_id) is task:
+            del self._pending_connects[guild_id]
+
+    async def on_voice_state_update(self, member, before, after, bot_user_id: int):
+        """
+        Pre-warms or hands over the guild's player when a member joins a voice channel,
+        and cleans up pool state when the bot itself leaves voice.
+        """
+        guild = member.guild
+        if member.id == bot_user_id:
+            if after.channel is None:
+                self._forget_guild(guild.id)
+            return
+
+        if not self.prewarm_enabled or member.bot:
+            return
+        if after.channel is None or (before.channel and before.channel.id == after.channel.id):
+            return
+        if not self.is_active_guild(guild.id):
+            return
+        await self.serialize(guild.id, self._prewarm, guild, after.channel)
+
+    async def _prewarm(self, guild, channel):
+        player: wavelink.Player = guild.voice_client
+        if player and player.connected:
+            # Hand over an idle player that has been left alone in another channel
+            if player.channel.id != channel.id and can_hand_over(player):
+                try:
+                    await player.move_to(channel)
+                except Exception as e:
+                    print(f"Pre-warm move failed in guild {guild.id}: {e}")
+            return
+
+        try:
+            await self.connect(guild, channel)
+        except Exception as e:
+            print(f"Pre-warm connect failed in guild {guild.id}: {e}")
+            return
+        self._schedule_idle(guild)
+
+    def _schedule_idle(self, guild):
+        if self.idle_timeout <= 0:
+            return
+        self._cancel_idle(guild.id)
+        self._idle_tasks[guild.id] = asyncio.create_task(self._idle_disconnect(guild))
+
+    def _cancel_idle(self, guild_id: int):
+        task = self._idle_tasks.pop(guild_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def _idle_disconnect(self, guild):
+        try:
+            await asyncio.sleep(self.idle_timeout)
+            await self.serialize(guild.id, self._disconnect_if_idle, guild)
+        except Exception as e:
+            print(f"Failed to disconnect idle pre-warmed player in guild {guild.id}: {e}")
+        finally:
+            if self._idle_tasks.get(guild.id) is asyncio.current_task():
+                del self._idle_tasks[guild.id]
+
+    async def _disconnect_if_idle(self, guild):
+        player: wavelink.Player = guild.voice_client
+        if player and player.connected and not player.playing and player.queue.is_empty:
+            await player.disconnect()
+
+    def _forget_guild(self, guild_id: int):
+        self._cancel_idle(guild_id)
+        self._ttfa_pending.pop(guild_id, None)
+
+    def begin_ttfa(self, guild_id: int, start: float, warm: bool):
+        """Starts a time-to-first-audio measurement; completed by `end_ttfa` on track start."""
+        self._ttfa_pending[guild_id] = (start, "warm" if warm else "cold")
+
+    def end_ttfa(self, guild_id: int) -> tuple[str, float] | None:
+        """Completes the pending measurement for the guild, if any, and returns (path, seconds)."""
+        pending = self._ttfa_pending.pop(guild_id, None)
+        if pending is None:
+            return None
+        start, path = pending
+        elapsed = self.clock() - start
+        self.ttfa.record(path, elapsed)
+        return path, elapsed